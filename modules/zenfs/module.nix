@@ -83,6 +83,39 @@ in
       };
     };
 
+    systemd.services.zenfs-roaming = {
+      description = "ZenFS Roaming Sync Service";
+      wantedBy = [ "multi-user.target" ];
+      serviceConfig = {
+        Type = "simple";
+        ExecStart = "${zenfsPkg}/bin/zenfs roaming --serve";
+        RuntimeDirectory = "zenfs";
+        Restart = "always";
+      };
+    };
+
+    systemd.services.zenfs-hotplug = {
+      description = "ZenFS Drive Hotplug Listener";
+      wantedBy = [ "multi-user.target" ];
+      after = [ "systemd-udevd.service" "zenfs-roaming.service" ];
+      serviceConfig = {
+        Type = "simple";
+        ExecStart = "${zenfsPkg}/bin/zenfs hotplug";
+        Restart = "always";
+      };
+    };
+
+    systemd.services.zenfs-missing = lib.mkIf cfg.roaming.enable {
+      description = "ZenFS Missing Drive Placeholders";
+      wantedBy = [ "multi-user.target" ];
+      serviceConfig = {
+        Type = "simple";
+        ExecStart = "${zenfsPkg}/bin/zenfs missing";
+        ExecStopPost = "-${pkgs.fuse}/bin/fusermount -u /System/ZenFS/MissingDrives";
+        Restart = "always";
+      };
+    };
+
     systemd.services.zenfs-offload = lib.mkIf cfg.roaming.enable {
       description = "ZenFS Disk Usage Offloader";
       serviceConfig = {
@@ -44,6 +44,7 @@ stdenv.mkDerivation {
         lib.makeBinPath [
           libnotify
           util-linux
+          fuse
         ]
       } \
       --set PYTHONPATH "$out/libexec/scripts/core"
@@ -1,48 +1,64 @@
 # File: src/scripts/core/attach.py
 import sys
 import json
-import shutil
 import time
-import subprocess
 from pathlib import Path
-from common import run_command, notify, LIVE_TEMP, ROAMING_ROOT, get_system_uuid
-from db_builder import rebuild_drive_db
+from common import run_command, notify, LIVE_TEMP, ROAMING_ROOT, get_system_uuid, mount_table
+from db_builder import rebuild_drive_db, manifest_uuid
+from roaming_service import request_sync
+import drive_cache
+from phase_trace import Tracer
 
-def attach(dev_node):
+def attach(dev_node, sync=True):
+    """
+    Validates and attaches one partition. Returns the ZenFS UUID it attached (or
+    validated, for system drives), else None. sync=False leaves the roaming sync to
+    the caller (the checker batches one for all devices).
+    """
+    span = Tracer("attach", Path(dev_node).name)
+    with span.total():
+        return _attach(dev_node, sync, span)
+
+def _attach(dev_node, sync, span):
     dev_name = Path(dev_node).name
     dev_full_path = Path(f"/dev/{dev_name}").resolve()
     
     # 0. Check Pre-existing Mounts (Skip Root/Already Mounted)
-    try:
-        # findmnt lists where this source device is mounted
-        res = subprocess.run(
-            ["findmnt", "-n", "--source", str(dev_full_path), "-o", "TARGET"], 
-            capture_output=True, text=True
-        )
-        existing_mounts = [m for m in res.stdout.strip().split('\n') if m]
-        
-        for mnt in existing_mounts:
-            if mnt == "/":
-                print(f"Skipping {dev_name}: Is System Root.")
-                return
-            if mnt.startswith("/Mount/Roaming"):
-                print(f"Skipping {dev_name}: Already attached at {mnt}.")
-                return
-            # If mounted somewhere else critical (like /home not via ZenFS), skip
-            if not mnt.startswith("/Live/Temp") and not mnt.startswith("/Mount"):
-                print(f"Skipping {dev_name}: In use at {mnt}.")
-                return
-    except Exception:
-        # If findmnt fails (e.g. not mounted), we proceed
-        pass
+    mounts = mount_table()
+    with span("mount-table"):
+        existing = mounts.targets_of(dev_full_path)
+    for mnt in existing:
+        if mnt == "/":
+            print(f"Skipping {dev_name}: Is System Root.")
+            return
+        if mnt.startswith(str(ROAMING_ROOT) + "/"):
+            print(f"Skipping {dev_name}: Already attached at {mnt}.")
+            return
+        # If mounted somewhere else critical (like /home not via ZenFS), skip
+        if not mnt.startswith(str(LIVE_TEMP)) and not mnt.startswith("/Mount"):
+            print(f"Skipping {dev_name}: In use at {mnt}.")
+            return
+
+    # 0b. Known Device? (Skip mounting partitions we've already seen aren't ZenFS)
+    with span("identify"):
+        ident = drive_cache.identify(dev_full_path)
+        known = drive_cache.lookup(ident)
+    if known and known["zenfs"] is None:
+        print(f"Skipping {dev_name}: Not a ZenFS drive (cached).")
+        return
+    if known and known["zenfs"]["type"] == "system":
+        print(f"Validated System Drive {known['zenfs']['uuid']} (cached). Skipping mount.")
+        if sync:
+            with span("sync-request"): request_sync("attached", known["zenfs"]["uuid"])
+        return known["zenfs"]["uuid"]
 
     temp_mount = LIVE_TEMP / get_system_uuid() / dev_name
     temp_mount.mkdir(parents=True, exist_ok=True)
     
     try:
         # 1. Mount to Live/Temp if not already mounted
-        if not any(p.mountpoint == str(temp_mount) for p in shutil.disk_usage(str(temp_mount)) if p.mountpoint == str(temp_mount)):
-             run_command(f"mount /dev/{dev_name} {temp_mount}")
+        if not mounts.is_mounted(temp_mount):
+            with span("mount"): run_command(f"mount /dev/{dev_name} {temp_mount}")
         
         # 2. Validation Logic
         json_path = temp_mount / "System/ZenFS/drive.json"
@@ -51,23 +67,25 @@ def attach(dev_node):
         uuid = None
         drive_type = "roaming"
         
-        if json_path.exists():
-            try:
-                data = json.load(open(json_path))
-                if "uuid" in data: 
-                    u = data["uuid"]
-                    # Validation: Must be 16 chars and alphanumeric
-                    if isinstance(u, str) and len(u) == 16 and u.isalnum():
-                        valid = True
-                        uuid = u
-                        drive_type = data.get("type", "roaming")
-            except: pass
+        with span("validate"):
+            if json_path.exists():
+                try:
+                    data = json.load(open(json_path))
+                    if "uuid" in data: 
+                        u = data["uuid"]
+                        # Validation: Must be 16 chars and alphanumeric
+                        if isinstance(u, str) and len(u) == 16 and u.isalnum():
+                            valid = True
+                            uuid = u
+                            drive_type = data.get("type", "roaming")
+                except: pass
         
         # 3. Self Healing: Stricter Heuristic
         if not valid and zenfs_structure.exists() and zenfs_structure.is_dir():
              print(f"Healing invalid ZenFS drive {dev_name} (Found /System/ZenFS structure)...")
              from common import generate_zenfs_uuid
-             uuid = generate_zenfs_uuid()
+             # Keep the identity the existing database was built for, so links survive the heal
+             uuid = manifest_uuid(temp_mount) or generate_zenfs_uuid()
              
              data = {
                  "uuid": uuid, 
@@ -77,7 +95,7 @@ def attach(dev_node):
              }
              json_path.parent.mkdir(parents=True, exist_ok=True)
              with open(json_path, "w") as f: json.dump(data, f)
-             rebuild_drive_db(temp_mount, uuid)
+             with span("rebuild-db"): rebuild_drive_db(temp_mount, uuid)
              valid = True
              drive_type = "roaming"
 
@@ -85,23 +103,32 @@ def attach(dev_node):
         if valid:
             if drive_type == "system":
                 print(f"Validated System Drive {uuid}. Skipping bind mount.")
-                run_command(f"umount {temp_mount}")
+                with span("unmount"): run_command(f"umount {temp_mount}")
                 try: temp_mount.rmdir() 
                 except: pass
-                run_command("zenfs roaming")
+                # Re-probe: our own mount just bumped the superblock
+                drive_cache.record(drive_cache.identify(dev_full_path), uuid, drive_type)
+                if sync:
+                    with span("sync-request"): request_sync("attached", uuid)
+                return uuid
             else:
+                drive_cache.record(ident, uuid, drive_type)
                 target = ROAMING_ROOT / uuid
                 target.mkdir(parents=True, exist_ok=True)
                 
                 # Double check target isn't already mounted (idempotency)
-                if not any(p.mountpoint == str(target) for p in shutil.disk_usage(str(target)) if p.mountpoint == str(target)):
-                    run_command(f"mount --bind {temp_mount} {target}")
+                if not mounts.is_mounted(target):
+                    with span("bind"): run_command(f"mount --bind {temp_mount} {target}")
                     notify("ZenFS", f"Attached {uuid}")
-                    run_command("zenfs roaming")
+                    if sync:
+                        with span("sync-request"): request_sync("attached", uuid)
+                    return uuid
         else:
-            run_command(f"umount {temp_mount}")
+            with span("unmount"): run_command(f"umount {temp_mount}")
             try: temp_mount.rmdir() 
             except: pass
+            # Re-probe: our own mount just bumped the superblock
+            drive_cache.record(drive_cache.identify(dev_full_path))
 
     except Exception as e:
         print(f"Attach failed on {dev_name}: {e}")
@@ -0,0 +1,194 @@
+# File: src/scripts/core/bench.py
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from common import generate_zenfs_uuid
+
+BENCH_USER = "bench"
+FUSE_SCRIPT = Path(__file__).resolve().parent / "fuse_fs.py"
+
+# --- Synthetic Tree ---
+def build_tree(root, drives, fanout, files, file_size, big_size):
+    """
+    Creates a fake local source, /Mount/Roaming and Ghost Database under `root`.
+    Returns [(virtual_rel, real_path)] for every file, plus the big sequential file.
+    """
+    source = root / "home"
+    roaming = root / "Roaming"
+    db_root = root / "Database"
+    payload = os.urandom(file_size)
+    entries = []
+
+    layouts = [("local", source / BENCH_USER)]
+    for _ in range(drives):
+        uuid = generate_zenfs_uuid()
+        layouts.append((uuid, roaming / uuid / "Users" / BENCH_USER))
+
+    for owner, user_root in layouts:
+        for i in range(fanout):
+            dir_name = f"{owner[:6]}-{i}"
+            (user_root / dir_name).mkdir(parents=True, exist_ok=True)
+            for j in range(files):
+                real = user_root / dir_name / f"f{j}"
+                real.write_bytes(payload)
+                entries.append((f"{BENCH_USER}/{dir_name}/f{j}", str(real)))
+
+            # Ghost DB entry for the top-level directory
+            if owner != "local":
+                ghost = db_root / BENCH_USER / dir_name
+                ghost.mkdir(parents=True, exist_ok=True)
+                (ghost / ".zenfs-folder").write_text(owner)
+
+    big = None
+    if big_size and drives:
+        uuid, user_root = layouts[-1]
+        real = user_root / "big.bin"
+        with open(real, "wb") as f:
+            chunk = os.urandom(1024 * 1024)
+            for _ in range(big_size):
+                f.write(chunk)
+        (db_root / BENCH_USER / "big.bin").write_text(uuid)
+        big = (f"{BENCH_USER}/big.bin", str(real))
+
+    (source / BENCH_USER).mkdir(parents=True, exist_ok=True)
+    return source, roaming, db_root, entries, big
+
+# --- Mounting ---
+def mount(source, mountpoint, roaming, db_root, fuse_args):
+    env = dict(os.environ, ZENFS_ROAMING_ROOT=str(roaming), ZENFS_DB_ROOT=str(db_root))
+    cmd = [sys.executable, str(FUSE_SCRIPT), str(source), str(mountpoint), "--union"] + fuse_args
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while not os.path.ismount(mountpoint):
+        if proc.poll() is not None or time.monotonic() > deadline:
+            proc.kill()
+            raise RuntimeError(f"zenfs-fuse failed to mount {mountpoint}")
+        time.sleep(0.05)
+    return proc
+
+def unmount(proc, mountpoint):
+    subprocess.run(["fusermount", "-u", str(mountpoint)], check=False)
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+# --- Measurements ---
+def summarize(latencies, total_bytes=0):
+    latencies.sort()
+    n = len(latencies)
+    elapsed = sum(latencies)
+    result = {
+        "ops": n,
+        "ops_per_s": round(n / elapsed, 1) if elapsed else 0,
+        "p50_us": round(latencies[n // 2] * 1e6, 1),
+        "p99_us": round(latencies[min(n - 1, int(n * 0.99))] * 1e6, 1),
+        "max_us": round(latencies[-1] * 1e6, 1),
+    }
+    if total_bytes:
+        result["mb_per_s"] = round(total_bytes / elapsed / 1e6, 1)
+    return result
+
+def timed(fn, items):
+    latencies = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def read_file(path):
+    with open(path, "rb", buffering=0) as f:
+        while f.read(1024 * 1024): pass
+
+def run_suite(paths, dirs, big):
+    results = {
+        "getattr": summarize(timed(os.lstat, paths)),
+        "readdir": summarize(timed(os.listdir, dirs)),
+        "open": summarize(timed(lambda p: os.close(os.open(p, os.O_RDONLY)), paths)),
+        "read": summarize(timed(read_file, paths), sum(os.path.getsize(p) for p in paths)),
+    }
+    if big:
+        results["sequential_read"] = summarize(timed(read_file, [big]), os.path.getsize(big))
+    return results
+
+def compare(direct, zenfs):
+    """ZenFS cost relative to direct access (1.0 == no overhead)."""
+    ratios = {}
+    for op, d in direct.items():
+        z = zenfs[op]
+        ratios[op] = {
+            "p50": round(z["p50_us"] / d["p50_us"], 2) if d["p50_us"] else None,
+            "p99": round(z["p99_us"] / d["p99_us"], 2) if d["p99_us"] else None,
+        }
+        if "mb_per_s" in d and d["mb_per_s"]:
+            ratios[op]["throughput"] = round(z["mb_per_s"] / d["mb_per_s"], 2)
+    return ratios
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="zenfs bench",
+                                     description="Benchmark the ZenFS FUSE layer against direct access on a synthetic tree")
+    parser.add_argument("--drives", type=int, default=6, help="Synthetic roaming drives")
+    parser.add_argument("--fanout", type=int, default=20, help="Top-level directories per drive")
+    parser.add_argument("--files", type=int, default=50, help="Files per directory")
+    parser.add_argument("--file-size", type=int, default=64, help="Size of each file in KiB")
+    parser.add_argument("--big-file", type=int, default=256, help="Size of the sequential-read file in MiB (0 skips)")
+    parser.add_argument("--samples", type=int, default=2000, help="Files sampled per operation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--root", help="Where to build the tree (default: a directory on /dev/shm)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic tree afterwards")
+    parser.add_argument("fuse_args", nargs=argparse.REMAINDER,
+                        help="Extra zenfs-fuse flags after '--' (e.g. -- --threaded --attr-timeout 0)")
+    args = parser.parse_args(argv)
+    fuse_args = [a for a in args.fuse_args if a != "--"]
+
+    base = args.root or ("/dev/shm" if os.path.isdir("/dev/shm") else None)
+    root = Path(tempfile.mkdtemp(prefix="zenfs-bench-", dir=base))
+    mountpoint = root / "Users"
+    mountpoint.mkdir()
+    random.seed(args.seed)
+
+    proc = None
+    try:
+        print(f"Building synthetic tree in {root}...", file=sys.stderr)
+        source, roaming, db_root, entries, big = build_tree(
+            root, args.drives, args.fanout, args.files, args.file_size * 1024, args.big_file)
+        sample = random.sample(entries, min(args.samples, len(entries)))
+        dirs = sorted({rel.rsplit("/", 1)[0] for rel, _ in sample})
+
+        # Direct baseline: the real file, and the real directory holding it
+        direct_dirs = sorted({real.rsplit("/", 1)[0] for _, real in sample})
+        direct = run_suite([real for _, real in sample], direct_dirs, big[1] if big else None)
+
+        proc = mount(source, mountpoint, roaming, db_root, fuse_args)
+        zenfs = run_suite([str(mountpoint / rel) for rel, _ in sample],
+                          [str(mountpoint / d) for d in dirs],
+                          str(mountpoint / big[0]) if big else None)
+
+        report = {
+            "timestamp": int(time.time()),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "fuse_args")},
+            "fuse_args": fuse_args,
+            "direct": direct,
+            "zenfs": zenfs,
+            "overhead": compare(direct, zenfs),
+        }
+        out = json.dumps(report, indent=2)
+        if args.output:
+            Path(args.output).write_text(out + "\n")
+        else:
+            print(out)
+    finally:
+        if proc: unmount(proc, mountpoint)
+        if not args.keep: shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
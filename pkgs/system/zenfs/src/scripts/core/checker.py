@@ -1,32 +1,83 @@
 # File: src/scripts/core/checker.py
 import os
-import multiprocessing
+import json
+import time
+import subprocess
 from pathlib import Path
-from common import run_command
+from concurrent.futures import ThreadPoolExecutor
+import attach
+from roaming_service import request_sync
+
+# Filesystem signatures `mount` can't take directly (containers, RAID/LVM members, swap)
+UNMOUNTABLE_FSTYPES = {
+    "swap", "LVM2_member", "crypto_LUKS", "linux_raid_member", "zfs_member",
+    "bcache", "ceph", "isw_raid_member", "ddf_raid_member", "BitLocker",
+}
+VOLUME_TYPES = ("part", "lvm", "crypt")
+
+def list_block_devices():
+    """
+    All block devices from one `lsblk --json` call: [{kname, type, fstype, pttype}].
+    Falls back to sd*/nvme* partition names from /dev (no filesystem info) without lsblk.
+    """
+    try:
+        res = subprocess.run(["lsblk", "--json", "--list", "-o", "KNAME,TYPE,FSTYPE,PTTYPE"],
+                             capture_output=True, text=True, check=True)
+        return [{k.lower(): v for k, v in dev.items()} for dev in json.loads(res.stdout)["blockdevices"]]
+    except (OSError, subprocess.CalledProcessError, ValueError, KeyError) as e:
+        print(f"lsblk unavailable ({e}), falling back to /dev scan.")
+
+    devices = []
+    for item in Path("/dev").iterdir():
+        name = item.name
+        if (name.startswith("sd") or name.startswith("nvme")) and name[-1].isdigit():
+            devices.append({"kname": name, "type": "part", "fstype": "unknown", "pttype": None})
+    return devices
+
+def skip_reason(dev):
+    """Why a device can't hold a ZenFS drive, or None if it's worth probing."""
+    dtype, fstype = dev.get("type") or "", dev.get("fstype")
+    if dtype == "disk":
+        # Whole disks only count when formatted directly (no partition table)
+        if dev.get("pttype") or not fstype: return "whole disk"
+    elif dtype not in VOLUME_TYPES and not dtype.startswith("raid"):
+        return f"{dtype} device"
+    if not fstype: return "no filesystem"
+    if fstype in UNMOUNTABLE_FSTYPES: return fstype
+    return None
 
 def check_device(dev_name):
-    """Worker function to attach a single device."""
+    """Worker function to attach a single device. Returns (uuid or None, seconds)."""
     print(f"Checking {dev_name}...")
+    start = time.perf_counter()
+    uuid = None
     try:
-        run_command(f"zenfs attach {dev_name}")
+        uuid = attach.attach(dev_name, sync=False)
     except Exception as e:
-        # Fail silently to avoid journal spam on non-ZenFS drives
-        pass
+        # Fail quietly to avoid journal spam on non-ZenFS drives
+        print(f"Attach error on {dev_name}: {e}")
+    return uuid, time.perf_counter() - start
 
 def main():
     print("ZenFS Checker: Scanning block devices (Parallel)...")
-    dev_root = Path("/dev")
-    devices = []
-    
-    # Scan for sd* (SATA/USB) and nvme* (NVMe) block devices
-    for item in dev_root.iterdir():
-        name = item.name
-        if (name.startswith("sd") or name.startswith("nvme")) and name[-1].isdigit():
-            devices.append(name)
+    start = time.perf_counter()
+
+    candidates = []
+    for dev in list_block_devices():
+        reason = skip_reason(dev)
+        if reason: print(f"Skipping {dev['kname']}: {reason}.")
+        else: candidates.append(dev["kname"])
     
-    if not devices: return
+    if not candidates: return
+
+    # Attach in threads: the work is mount/IO waits, so one process is enough
+    with ThreadPoolExecutor(max_workers=min(len(candidates), (os.cpu_count() or 4) * 2)) as pool:
+        results = dict(zip(candidates, pool.map(check_device, candidates)))
+
+    for name, (uuid, elapsed) in sorted(results.items(), key=lambda r: -r[1][1]):
+        print(f"  {name:<12} {elapsed * 1000:8.1f} ms  {uuid or '-'}")
+    attached = [uuid for uuid, _ in results.values() if uuid]
+    print(f"Checked {len(candidates)} devices in {time.perf_counter() - start:.2f}s, {len(attached)} ZenFS drives.")
 
-    # Use multiprocessing to attach drives in parallel to speed up boot
-    count = min(len(devices), os.cpu_count() or 4)
-    with multiprocessing.Pool(processes=count) as pool:
-        pool.map(check_device, devices)
\ No newline at end of file
+    # One sync for everything found at boot
+    if attached: request_sync("attached", ",".join(attached))
@@ -2,19 +2,26 @@
 import os
 import sys
 import json
+import select
 import subprocess
+import threading
 import random
 import string
+import re
 import fnmatch
 from pathlib import Path
+from collections import namedtuple
 
 # --- Constants ---
 ZENFS_ROOT = Path("/System/ZenFS")
-DB_ROOT = ZENFS_ROOT / "Database"
 MOUNT_ROOT = Path("/Mount")
-ROAMING_ROOT = MOUNT_ROOT / "Roaming"
+# DB and roaming roots can be redirected at a synthetic tree (see bench.py)
+DB_ROOT = Path(os.environ.get("ZENFS_DB_ROOT", ZENFS_ROOT / "Database"))
+ROAMING_ROOT = Path(os.environ.get("ZENFS_ROAMING_ROOT", MOUNT_ROOT / "Roaming"))
 MISSING_ROOT = ZENFS_ROOT / "MissingDrives"
+READ_CACHE_ROOT = ZENFS_ROOT / "ReadCache"
 LIVE_TEMP = Path("/Live/Temp")
+ROAMING_SOCKET = Path(os.environ.get("ZENFS_ROAMING_SOCKET", "/run/zenfs/roaming.sock"))
 CONFIG_ROOT = Path("/Config")
 IGNORE_FILE = ZENFS_ROOT / "ignore_list.json"
 CONFIG_MAP_FILE = ZENFS_ROOT / "config_categories.json"
@@ -44,13 +51,162 @@ def run_command(cmd):
     """Executes a shell command, raising an error on failure."""
     subprocess.run(cmd, check=True, shell=True)
 
+# --- Mount Table ---
+MOUNTINFO = "/proc/self/mountinfo"
+Mount = namedtuple("Mount", "devno root target fstype source options")
+
+def _unescape(field):
+    # mountinfo escapes space, tab, newline and backslash as \ooo
+    return re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), field)
+
+def _parse_mountinfo(text):
+    mounts = []
+    for line in text.splitlines():
+        # <id> <parent> <maj:min> <root> <target> <options> [optional...] - <fstype> <source> <super options>
+        left, _, right = line.partition(" - ")
+        fields, tail = left.split(" "), right.split(" ")
+        if len(fields) < 6 or len(tail) < 2: continue
+        mounts.append(Mount(fields[2], _unescape(fields[3]), _unescape(fields[4]), tail[0], _unescape(tail[1]), fields[5]))
+    return mounts
+
+class MountTable:
+    """
+    Parsed /proc/self/mountinfo, indexed by target and by source device. The kernel
+    flags the open file with POLLPRI whenever the table changes, so refresh() is a
+    zero-timeout poll unless something was actually mounted or unmounted.
+    """
+    def __init__(self, path=MOUNTINFO):
+        self.path = path
+        self.file = open(path)
+        self.watcher = None
+        self.poller = select.poll()
+        self.poller.register(self.file, select.POLLERR | select.POLLPRI)
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        self.file.seek(0)
+        mounts = _parse_mountinfo(self.file.read())
+        by_target, by_devno, by_source = {}, {}, {}
+        for mount in mounts:
+            by_target[mount.target] = mount # Later entries are stacked on top
+            by_devno.setdefault(mount.devno, []).append(mount)
+            by_source.setdefault(mount.source, []).append(mount)
+        self.mounts, self.by_target, self.by_devno, self.by_source = mounts, by_target, by_devno, by_source
+
+    def refresh(self):
+        """Re-reads the table if it changed since the last look. Returns True if it did."""
+        with self.lock:
+            if not self.poller.poll(0): return False
+            self._load()
+            return True
+
+    def wait(self, timeout=None):
+        """Blocks until the mount table changes (or `timeout` seconds pass), then reloads it."""
+        if self.watcher is None:
+            # Own file handle: each open mountinfo tracks its own change events, so
+            # refresh() calls from other threads can't swallow ours
+            self.watch_file = open(self.path)
+            self.watcher = select.poll()
+            self.watcher.register(self.watch_file, select.POLLERR | select.POLLPRI)
+        if not self.watcher.poll(None if timeout is None else int(timeout * 1000)): return False
+        with self.lock: self._load()
+        return True
+
+    def get(self, target):
+        """The Mount at `target` (the top one if stacked), or None."""
+        self.refresh()
+        return self.by_target.get(os.path.normpath(str(target)))
+
+    def is_mounted(self, target):
+        return self.get(target) is not None
+
+    def targets_of(self, device):
+        """
+        Everywhere a block device is mounted, bind mounts included. Matched by source path
+        and by major:minor (btrfs reports anonymous device numbers, so neither alone is enough).
+        """
+        self.refresh()
+        mounts = list(self.by_source.get(str(device), []))
+        try:
+            rdev = os.stat(device).st_rdev
+            mounts += self.by_devno.get(f"{os.major(rdev)}:{os.minor(rdev)}", [])
+        except OSError:
+            pass
+        return list(dict.fromkeys(m.target for m in mounts))
+
+    def under(self, root):
+        """Mounts whose target is strictly below `root`."""
+        self.refresh()
+        prefix = os.path.normpath(str(root)).rstrip("/") + "/"
+        return [m for m in self.by_target.values() if m.target.startswith(prefix)]
+
+_mount_table = None
+_mount_table_lock = threading.Lock()
+
+def mount_table():
+    """Process-wide MountTable (parsed once, refreshed on change)."""
+    global _mount_table
+    with _mount_table_lock:
+        if _mount_table is None: _mount_table = MountTable()
+        return _mount_table
+
 # --- Filtering Logic ---
+class IgnoreMatcher:
+    """
+    Compiled form of the ignore list. Rules are split once into exact names (set lookup),
+    name globs (one combined regex) and path prefixes (a single str.startswith on a tuple),
+    so a check costs a few C-level calls however long the list is.
+    """
+    def __init__(self, rules):
+        self.rules = []
+        names, globs, prefixes = set(), [], []
+        try:
+            for rule in rules:
+                if not isinstance(rule, str): break # The old per-rule loop stopped (and matched nothing) here
+                self.rules.append(rule)
+                # Handle user-provided wildcard prefix if present
+                clean_rule = rule[1:] if rule.startswith("*") else rule
+                if "/" in clean_rule:
+                    prefixes.append(clean_rule) # Path-based ignore (e.g., "Downloads/Temp")
+                else:
+                    names.add(rule) # Exact name (e.g., ".config"); also holds for "[a]"-style rules
+                    if any(c in rule for c in "*?["):
+                        globs.append(fnmatch.translate(rule)) # Pattern-based ignore (e.g., "*.tmp")
+        except TypeError:
+            pass
+        self.names = frozenset(names)
+        self.glob = re.compile("|".join(globs)) if globs else None
+        self.prefixes = tuple(prefixes)
+
+    def matches(self, rel_str, name):
+        """`rel_str` is the path relative to the user's root, `name` its last component."""
+        if name in self.names: return True
+        if self.prefixes and rel_str.startswith(self.prefixes): return True
+        return self.glob is not None and self.glob.match(name) is not None
+
+_ignore_cache = (None, IgnoreMatcher([]))
+
 def load_ignore_list():
-    """Loads the JSON ignore list for DB generation."""
-    if not IGNORE_FILE.exists(): return []
+    """
+    Returns the compiled ignore list for DB generation. Shared process-wide and only
+    re-read when ignore_list.json changes on disk.
+    """
+    global _ignore_cache
     try:
-        with open(IGNORE_FILE) as f: return json.load(f)
-    except: return []
+        st = IGNORE_FILE.stat()
+        key = (st.st_mtime_ns, st.st_size, st.st_ino)
+    except OSError:
+        key = None
+    if key == _ignore_cache[0]: return _ignore_cache[1]
+
+    rules = []
+    if key is not None:
+        try:
+            with open(IGNORE_FILE) as f: rules = json.load(f)
+        except: rules = []
+    _ignore_cache = (key, IgnoreMatcher(rules))
+    return _ignore_cache[1]
 
 def is_ignored(path_obj, relative_root, ignore_list):
     """
@@ -59,23 +215,12 @@ def is_ignored(path_obj, relative_root, ignore_list):
     Args:
         path_obj (Path): The full path of the file being checked.
         relative_root (Path): The root against which the path is relative (e.g., /Users/user).
-        ignore_list (list): List of patterns/paths to ignore.
+        ignore_list (IgnoreMatcher | list): Compiled matcher, or a raw list of patterns/paths.
     """
+    if not isinstance(ignore_list, IgnoreMatcher):
+        ignore_list = IgnoreMatcher(ignore_list)
     try:
         rel_path = path_obj.relative_to(relative_root)
-        rel_str = str(rel_path)
-        name = path_obj.name
-        
-        for rule in ignore_list:
-            # Handle user-provided wildcard prefix if present
-            clean_rule = rule[1:] if rule.startswith("*") else rule
-            
-            if "/" in clean_rule:
-                # Path-based ignore (e.g., "Downloads/Temp")
-                if rel_str.startswith(clean_rule): return True
-            else:
-                # Pattern-based ignore (e.g., ".config", "*.tmp")
-                if rule == name or fnmatch.fnmatch(name, rule): return True
     except: 
-        pass
-    return False
\ No newline at end of file
+        return False
+    return ignore_list.matches(str(rel_path), path_obj.name)
\ No newline at end of file
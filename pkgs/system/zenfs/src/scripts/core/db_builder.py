@@ -1,50 +1,148 @@
 # File: src/scripts/core/db_builder.py
 import os
-import shutil
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from common import load_ignore_list, is_ignored
+from common import load_ignore_list
+from ghost_db import open_db, drive_db_root, Journal
 
-def rebuild_drive_db(mount_point, uuid):
+MANIFEST_VERSION = 1
+SCAN_WORKERS = 8
+
+def _manifest_path(drive_root):
+    return Path(drive_root) / "System/ZenFS/db_manifest.json"
+
+def load_manifest(drive_root):
+    """Returns the manifest stored by the last build on this drive, or None."""
+    try:
+        with open(_manifest_path(drive_root)) as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION: return manifest
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _write_manifest(drive_root, uuid, entries):
+    manifest = {"version": MANIFEST_VERSION, "uuid": uuid, "entries": entries, "builtAt": int(time.time())}
+    path = _manifest_path(drive_root)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f: json.dump(manifest, f)
+    os.replace(tmp, path)
+
+def manifest_uuid(drive_root):
+    """UUID the database on this drive was built for (lets healing keep the drive's identity)."""
+    manifest = load_manifest(drive_root)
+    return manifest.get("uuid") if manifest else None
+
+def _scan_user(user_path, ignore_list):
+    items = {}
+    with os.scandir(user_path) as it:
+        for entry in it:
+            # Top-level entry: its path relative to the user's root is just its name
+            if ignore_list.matches(entry.name, entry.name):
+                continue
+            # d_type answers is_dir() without a stat (only symlinks get followed)
+            items[entry.name] = entry.is_dir()
+    return items
+
+def _scan_users(users_root, ignore_list, workers=SCAN_WORKERS):
+    """Current top-level listing: {user: {name: is_dir}} for non-ignored entries."""
+    start = time.monotonic()
+    with os.scandir(users_root) as it:
+        users = [e for e in it if e.is_dir()]
+
+    # One task per user: slow drives overlap their directory reads instead of queueing
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(users)))) as pool:
+        futures = {e.name: pool.submit(_scan_user, e.path, ignore_list) for e in users}
+        listing = {name: future.result() for name, future in futures.items()}
+
+    elapsed = time.monotonic() - start
+    scanned = sum(len(items) for items in listing.values())
+    print(f"Scanned {scanned} entries for {len(listing)} users in {elapsed:.2f}s "
+          f"({scanned / max(elapsed, 1e-6):.0f} entries/s).")
+    return listing
+
+def rebuild_drive_db(mount_point, uuid, full=False):
     """
-    Scans a physical drive's /Users directory and generates the 'Ghost Database' 
-    structure inside /System/ZenFS/Database on that drive.
+    Scans a physical drive's /Users directory and generates the 'Ghost Database'
+    on that drive (tree or compact format, whichever the drive already uses).
+
+    By default only the entries that changed since the last build are touched; a full
+    rebuild runs when asked, or when there is no manifest for this UUID to diff against.
     """
     drive_root = Path(mount_point)
-    db_root = drive_root / "System/ZenFS/Database"
+    manifest = load_manifest(drive_root)
+
+    with open_db(drive_db_root(drive_root)) as db:
+        if full or not manifest or manifest.get("uuid") != uuid or not db.exists():
+            return _full_rebuild(drive_root, db, uuid)
+        return _incremental_rebuild(drive_root, db, uuid)
+
+def _incremental_rebuild(drive_root, db, uuid):
+    users_root = drive_root / "Users"
+    print(f"Updating DB for {uuid} at {drive_root}...")
+
+    wanted = _scan_users(users_root, load_ignore_list()) if users_root.exists() else {}
+    current = db.listing()
+    added = removed = 0
+    changes = []
+
+    with db.batch():
+        # Users that no longer exist on the drive
+        for user in current.keys() - wanted.keys():
+            db.delete(user)
+            # Per entry, so the system DB keeps this user's entries from other drives
+            changes.extend(("delete", f"{user}/{name}", None, None) for name in current[user])
+            removed += len(current[user])
+
+        for user, items in wanted.items():
+            existing = current.get(user, {})
+
+            for name, is_dir in existing.items():
+                if items.get(name) == is_dir: continue
+                # Gone (or changed type): drop the stale ghost
+                db.delete(f"{user}/{name}")
+                changes.append(("delete", f"{user}/{name}", None, None))
+                removed += 1
+
+            for name, is_dir in items.items():
+                if existing.get(name) == is_dir: continue
+                db.put(f"{user}/{name}", uuid, is_dir)
+                changes.append(("put", f"{user}/{name}", uuid, is_dir))
+                added += 1
+
+    # Lets the roaming sync merge just these changes into the system DB
+    Journal(db.root).append(changes)
+    _write_manifest(drive_root, uuid, sum(len(items) for items in wanted.values()))
+    print(f"Database update complete for {uuid}: +{added} -{removed}.")
+
+def _full_rebuild(drive_root, db, uuid):
     users_root = drive_root / "Users"
     ignore_list = load_ignore_list()
-    
-    print(f"Rebuilding DB for {uuid} at {mount_point}...")
-    
+
+    print(f"Rebuilding DB for {uuid} at {drive_root}...")
+
     # Clean slate for the DB on the drive
-    if db_root.exists():
-        shutil.rmtree(db_root)
-    db_root.mkdir(parents=True, exist_ok=True)
-    
+    db.clear()
+
     if not users_root.exists():
         print("No /Users found on drive, skipping DB generation.")
+        Journal(db.root).reset()
+        _write_manifest(drive_root, uuid, 0)
         return
 
-    # Iterate users (e.g., /Users/doromiert)
-    for user_dir in users_root.iterdir():
-        if not user_dir.is_dir(): continue
-        
-        user_db_target = db_root / user_dir.name
-        user_db_target.mkdir(parents=True, exist_ok=True)
+    listing = _scan_users(users_root, ignore_list)
 
-        # Create Ghost Files
-        for item in user_dir.iterdir():
-            if is_ignored(item, user_dir, ignore_list): 
-                continue
-            
-            ghost_path = user_db_target / item.name
-            
-            if item.is_dir():
-                ghost_path.mkdir(exist_ok=True)
-                # Directories contain a marker file with the UUID
-                (ghost_path / ".zenfs-folder").write_text(uuid)
-            else:
-                # Files are represented by a file containing the UUID
-                ghost_path.write_text(uuid)
-
-    print(f"Database build complete for {uuid}.")
\ No newline at end of file
+    # Create Ghost Entries per user (e.g., /Users/doromiert); directories get a
+    # '.zenfs-folder' marker in tree format
+    entries = [(f"{user}/{name}", uuid, is_dir) for user, items in listing.items() for name, is_dir in items.items()]
+    start = time.monotonic()
+    with db.batch():
+        db.put_many(entries, SCAN_WORKERS)
+    print(f"Wrote {len(entries)} entries in {time.monotonic() - start:.2f}s.")
+
+    # New journal epoch: readers re-merge this drive whole
+    Journal(db.root).reset()
+    _write_manifest(drive_root, uuid, len(entries))
+    print(f"Database build complete for {uuid}.")
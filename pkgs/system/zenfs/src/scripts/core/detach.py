@@ -1,20 +1,48 @@
 # File: src/scripts/core/detach.py
 import sys
 from pathlib import Path
-from common import run_command, notify, ROAMING_ROOT
+from common import run_command, notify, ROAMING_ROOT, LIVE_TEMP, mount_table
+from roaming_service import request_sync, departing_entries, retarget_departed
+from phase_trace import Tracer
 
-def detach(target):
+def detach(target, sync=True):
+    span = Tracer("detach", Path(target).name)
+    with span.total():
+        _detach(target, sync, span)
+
+def _detach(target, sync, span):
     print(f"Detaching {target}...")
     mount_point = Path(target)
     
     if not mount_point.is_absolute():
         mount_point = ROAMING_ROOT / target
         
-    if mount_point.exists():
-        try:
-            run_command(f"umount {mount_point}")
-            notify("ZenFS", f"Detached {mount_point.name}")
+    mounts = mount_table()
+    mount = mounts.get(mount_point)
+    if mount is None:
+        print(f"{mount_point} is not mounted.")
+        return
+
+    # Note what this drive owns while its database is still readable
+    uuid = mount_point.name if mount_point.parent == ROAMING_ROOT else None
+    entries = None
+    if uuid:
+        with span("read-db"):
+            try: entries = departing_entries(uuid, mount_point)
+            except Exception as e: print(f"Could not list entries of {uuid}: {e}")
+
+    try:
+        with span("unmount"): run_command(f"umount {mount_point}")
+        # attach bind-mounts from a staging mount under /Live/Temp: release that too
+        for staging in mounts.under(LIVE_TEMP):
+            if staging.devno == mount.devno and staging.source == mount.source:
+                with span("unmount-staging"): run_command(f"umount {staging.target}")
+        notify("ZenFS", f"Detached {mount_point.name}")
+        if entries is not None:
+            # Only this drive's links change: point them at the placeholders
+            with span("retarget"): retarget_departed(uuid, entries)
+        elif sync:
             # Trigger roaming to update symlinks (removes dead files)
-            run_command("zenfs roaming")
-        except Exception as e:
-            notify("ZenFS Error", f"Detach failed: {e}")
\ No newline at end of file
+            with span("sync-request"): request_sync("detached", mount_point.name)
+    except Exception as e:
+        notify("ZenFS Error", f"Detach failed: {e}")
@@ -8,6 +8,11 @@ import attach
 import detach
 import watcher
 import offload
+import bench
+import missing_fs
+import hotplug
+import phase_trace
+import ghost_db
 
 def main():
     if len(sys.argv) < 2:
@@ -19,7 +24,14 @@ def main():
     if cmd == "core":
         core_service.main()
     elif cmd == "roaming":
-        roaming_service.main()
+        # Usage: zenfs roaming [--dry-run | --serve | --request [--wait]]
+        args = sys.argv[2:]
+        if "--serve" in args:
+            roaming_service.serve()
+        elif "--request" in args:
+            roaming_service.request_sync(wait="--wait" in args)
+        else:
+            roaming_service.main(dry_run="--dry-run" in args)
     elif cmd == "checker":
         checker.main()
     elif cmd == "watcher":
@@ -44,6 +56,23 @@ def main():
     elif cmd == "detach":
         if len(sys.argv) < 3: return
         detach.detach(sys.argv[2])
+    elif cmd == "db":
+        # Usage: zenfs db convert <tree|sqlite> [db_root]
+        if len(sys.argv) < 4 or sys.argv[2] != "convert" or sys.argv[3] not in ("tree", "sqlite"):
+            print("Usage: zenfs db convert <tree|sqlite> [db_root]")
+            return
+        db_root = sys.argv[4] if len(sys.argv) > 4 else ghost_db.DB_ROOT
+        ghost_db.convert(db_root, sys.argv[3])
+    elif cmd == "trace":
+        # Usage: zenfs trace [--boots N] [--top K]
+        phase_trace.main(sys.argv[2:])
+    elif cmd == "hotplug":
+        hotplug.main()
+    elif cmd == "missing":
+        # Usage: zenfs missing [mountpoint]
+        missing_fs.main(sys.argv[2:])
+    elif cmd == "bench":
+        bench.main(sys.argv[2:])
     else:
         print(f"Unknown command: {cmd}")
 
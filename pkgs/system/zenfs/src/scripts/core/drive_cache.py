@@ -0,0 +1,122 @@
+# File: src/scripts/core/drive_cache.py
+import os
+import json
+import time
+import struct
+import threading
+import subprocess
+from pathlib import Path
+from common import ZENFS_ROOT
+
+CACHE_FILE = ZENFS_ROOT / "drive_cache.json"
+
+_lock = threading.Lock()
+
+# --- Probing ---
+def _udev_props(dev_path):
+    """ID_FS_* properties from the udev database (no subprocess), or {}."""
+    try:
+        rdev = os.stat(dev_path).st_rdev
+        data = Path(f"/run/udev/data/b{os.major(rdev)}:{os.minor(rdev)}").read_text()
+    except OSError:
+        return {}
+    return dict(line[2:].split("=", 1) for line in data.splitlines() if line.startswith("E:") and "=" in line)
+
+def _blkid_props(dev_path):
+    try:
+        res = subprocess.run(["blkid", "-p", "-o", "export", str(dev_path)], capture_output=True, text=True)
+    except OSError:
+        return {}
+    props = dict(line.split("=", 1) for line in res.stdout.splitlines() if "=" in line)
+    return {"ID_FS_UUID": props.get("UUID"), "ID_FS_TYPE": props.get("TYPE")}
+
+def _superblock_generation(dev_path, fs_type):
+    """Something that changes whenever the filesystem is written (ext: s_wtime/s_mnt_count, btrfs: generation)."""
+    try:
+        with open(dev_path, "rb") as f:
+            if fs_type in ("ext2", "ext3", "ext4"):
+                f.seek(1024 + 44)
+                mtime, wtime, mnt_count = struct.unpack("<IIH", f.read(10))
+                return f"{mtime}:{wtime}:{mnt_count}"
+            if fs_type == "btrfs":
+                f.seek(0x10000 + 0x48)
+                return str(struct.unpack("<Q", f.read(8))[0])
+    except (OSError, struct.error):
+        pass
+    return None
+
+def identify(dev_path):
+    """Returns (fs_uuid, fs_type, generation) for a block device, or None if it has no filesystem UUID."""
+    props = _udev_props(dev_path)
+    if not props.get("ID_FS_UUID"):
+        props = _blkid_props(dev_path)
+    fs_uuid, fs_type = props.get("ID_FS_UUID"), props.get("ID_FS_TYPE")
+    if not fs_uuid: return None
+    return fs_uuid, fs_type, _superblock_generation(dev_path, fs_type)
+
+# --- Cache ---
+def _load():
+    try:
+        with open(CACHE_FILE) as f: return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save(cache):
+    tmp = CACHE_FILE.with_suffix(".tmp")
+    try:
+        with open(tmp, "w") as f: json.dump(cache, f)
+        os.replace(tmp, CACHE_FILE)
+    except OSError as e:
+        print(f"Failed to save drive cache: {e}")
+
+def lookup(ident):
+    """
+    Cached verdict for a device identity: {"zenfs": None} for 'not ZenFS',
+    {"zenfs": {"uuid": ..., "type": ...}} for a known drive, or None when unknown/stale.
+    """
+    if not ident: return None
+    fs_uuid, fs_type, gen = ident
+    entry = _load().get(fs_uuid)
+    if not entry or entry.get("fsType") != fs_type: return None
+    # Roaming drives get mounted anyway and drive.json is re-checked there, so the
+    # generation (which every mount bumps) only has to match for answers that skip the
+    # mount: 'not ZenFS' and system drives. Without one (vfat, exfat, ntfs, xfs) we can't
+    # tell whether another machine (re)minted the filesystem since we looked, so those
+    # answers are never trusted.
+    if _skips_mount(entry.get("zenfs")) and (gen is None or entry.get("generation") != gen): return None
+    return entry
+
+def _skips_mount(zenfs):
+    return zenfs is None or zenfs.get("type") == "system"
+
+def record(ident, zenfs_uuid=None, drive_type=None):
+    """
+    Stores the outcome of a full mount-and-validate for this device. For 'not ZenFS'
+    and system drives pass the identity probed after unmounting, since the probe mount
+    itself bumps it.
+    """
+    if not ident: return
+    fs_uuid, fs_type, gen = ident
+    zenfs = {"uuid": zenfs_uuid, "type": drive_type} if zenfs_uuid else None
+    if _skips_mount(zenfs) and gen is None:
+        forget(fs_uuid=fs_uuid) # Unversioned answers that skip the mount would go stale unnoticed
+        return
+    with _lock:
+        cache = _load()
+        cache[fs_uuid] = {
+            "fsType": fs_type,
+            "generation": gen,
+            "zenfs": zenfs,
+            "checked": int(time.time()),
+        }
+        _save(cache)
+
+def forget(dev_path=None, fs_uuid=None):
+    """Drops the entry for a device (after mint, or when a cached answer proved wrong)."""
+    if fs_uuid is None:
+        ident = identify(dev_path)
+        if not ident: return
+        fs_uuid = ident[0]
+    with _lock:
+        cache = _load()
+        if cache.pop(fs_uuid, None) is not None: _save(cache)
@@ -1,34 +1,343 @@
 # File: src/scripts/core/fuse_fs.py
 import os
 import sys
+import stat
+import time
 import errno
+import argparse
+import itertools
+import threading
 import fuse
+from collections import OrderedDict
+from contextlib import nullcontext
 from pathlib import Path
-from common import ROAMING_ROOT
+from common import ROAMING_ROOT, READ_CACHE_ROOT, mount_table
+from ghost_db import GhostIndex, record_entry
+from read_cache import RoamingReadCache
+from readahead import ReadAhead, READAHEAD_MAX
+from fuse_stats import OpStats, STATS_PATH, dump_periodically
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Resolution Cache ---
+CACHE_SIZE = 65536
+NEGATIVE_CACHE_SIZE = 16384
+
+# Kernel-side caching (seconds). The negative timeout also bounds our own miss cache,
+# since files can appear on a roaming drive without passing through us.
+ATTR_TIMEOUT = 1.0
+ENTRY_TIMEOUT = 1.0
+NEGATIVE_TIMEOUT = 1.0
+
+class PathCache:
+    """
+    Bounded LRU mapping virtual paths to their resolved (real_path, source).
+    Misses live in a separate, smaller negative-dentry table with a TTL so that
+    probes for nonexistent files (editors, indexers) can't evict real entries.
+    """
+    def __init__(self, maxsize=CACHE_SIZE, negative_size=NEGATIVE_CACHE_SIZE, negative_ttl=NEGATIVE_TIMEOUT):
+        self.maxsize = maxsize
+        self.negative_size = negative_size
+        self.negative_ttl = negative_ttl
+        self.entries = OrderedDict()
+        self.missing = OrderedDict() # path -> (real_path, expires)
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None:
+                self.entries.move_to_end(path)
+                return entry
+
+            miss = self.missing.get(path)
+            if miss is None: return None
+            real_path, expires = miss
+            if expires < time.monotonic():
+                del self.missing[path]
+                return None
+            return real_path, "missing"
+
+    def put(self, path, real_path, source):
+        with self.lock:
+            if source == "missing":
+                if self.negative_ttl <= 0: return
+                self.missing[path] = (real_path, time.monotonic() + self.negative_ttl)
+                self.missing.move_to_end(path)
+                if len(self.missing) > self.negative_size:
+                    self.missing.popitem(last=False)
+                return
+
+            self.missing.pop(path, None)
+            self.entries[path] = (real_path, source)
+            self.entries.move_to_end(path)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, path):
+        with self.lock:
+            self.entries.pop(path, None)
+            self.missing.pop(path, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.missing.clear()
+
+# --- Threading ---
+DEFAULT_WORKERS = 4 # Concurrent I/O operations allowed per roaming drive
+
+def drive_of(real_path):
+    """Returns the UUID of the roaming drive holding `real_path`, or None for local paths."""
+    roaming_prefix = str(ROAMING_ROOT) + "/"
+    if not real_path.startswith(roaming_prefix): return None
+    return real_path[len(roaming_prefix):].split("/", 1)[0]
+
+def mounted_drives():
+    """UUIDs currently mounted under ROAMING_ROOT (detach leaves the empty directory behind)."""
+    prefix = str(ROAMING_ROOT) + "/"
+    return [m.target[len(prefix):] for m in mount_table().under(ROAMING_ROOT)
+            if "/" not in m.target[len(prefix):]]
+
+class DriveGates:
+    """Caps concurrent I/O per roaming drive so one slow disk can't occupy every FUSE worker."""
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self.workers = workers
+        self.gates = {}
+        self.lock = threading.Lock()
+
+    def for_path(self, real_path):
+        """Returns the semaphore for the drive backing `real_path`, or None for local files."""
+        uuid = drive_of(real_path)
+        if uuid is None: return None
+        with self.lock:
+            gate = self.gates.get(uuid)
+            if gate is None:
+                gate = self.gates[uuid] = threading.BoundedSemaphore(self.workers)
+            return gate
+
+# --- Write Placement ---
+# Where files/dirs created through the union land when the path is new:
+#   local    - the mirror source (main drive)
+#   emptiest - the mounted roaming drive with the most free space
+#   parent   - whichever drive already holds the parent directory
+PLACEMENT_POLICIES = ("local", "emptiest", "parent")
+FREE_SPACE_TTL = 5.0
+
+# --- Large Transfers ---
+MAX_IO = 128 * 1024 # Largest read/write request libfuse 2 negotiates with the kernel
+KERNEL_READAHEAD = 1024 * 1024
+
+# --- Directory Streams ---
+def _dirent_attrs(entry):
+    """File type straight from d_type (no stat unless the fs reports DT_UNKNOWN)."""
+    if entry.is_symlink(): mode = stat.S_IFLNK
+    elif entry.is_dir(follow_symlinks=False): mode = stat.S_IFDIR
+    elif entry.is_file(follow_symlinks=False): mode = stat.S_IFREG
+    else: mode = 0
+    return {'st_mode': mode, 'st_ino': entry.inode()}
+
+class DirStream:
+    """
+    Resumable union listing for one opendir handle.
+    Entries are produced lazily from os.scandir over each source directory, deduplicated
+    by name, and numbered so the kernel can continue from any offset it hands back.
+    """
+    def __init__(self, sources):
+        self.sources = sources
+        self._restart()
+
+    def _restart(self):
+        self.entries = self._scan()
+        self.position = 0
+        self.pending = None # Entry yielded but not yet accepted by the kernel
+
+    def _scan(self):
+        yield '.', {'st_mode': stat.S_IFDIR}
+        yield '..', {'st_mode': stat.S_IFDIR}
+        seen = set()
+        for source in self.sources:
+            try:
+                it = os.scandir(source)
+            except OSError:
+                continue # Not present (or not a directory) on this drive
+            with it:
+                for entry in it:
+                    if entry.name in seen: continue
+                    seen.add(entry.name)
+                    yield entry.name, _dirent_attrs(entry)
+
+    def read(self, offset):
+        if offset != self.position:
+            # Kernel rewound (seekdir/rewinddir): rescan and skip ahead
+            self.close()
+            self._restart()
+            for _ in range(offset):
+                if next(self.entries, None) is None: return
+            self.position = offset
+
+        while True:
+            if self.pending is None:
+                self.pending = next(self.entries, None)
+                if self.pending is None: return
+            name, attrs = self.pending
+            yield name, attrs, self.position + 1
+            # Only resumed when the kernel's buffer took the entry
+            self.pending = None
+            self.position += 1
+
+    def close(self):
+        self.entries.close()
+
+class ZenFUSE(fuse.FUSE):
+    """
+    fusepy drops the readdir offset; forward it so ZenFS can resume large listings.
+    Also marks the virtual stats file direct_io, since its size isn't known up front.
+    """
+    def open(self, path, fip):
+        ret = super().open(path, fip)
+        if path == STATS_PATH.encode():
+            fip.contents.direct_io = 1
+        return ret
+
+    def readdir(self, path, buf, filler, offset, fip):
+        for name, attrs, next_offset in self.operations('readdir', self._decode_optional_path(path),
+                                                        fip.contents.fh, offset):
+            st = None
+            if attrs:
+                st = fuse.c_stat()
+                fuse.set_st_attrs(st, attrs, use_ns=self.use_ns)
+            if filler(buf, name.encode(self.encoding), st, next_offset) != 0:
+                break
+        return 0
+
+def watch_mounts(callback):
+    """
+    Blocks on the mount table and fires `callback` whenever it changes
+    (drive attached or detached under /Mount/Roaming, among others).
+    """
+    mounts = mount_table()
+    while True:
+        if mounts.wait(): callback()
 
 class ZenFS(fuse.Operations):
-    def __init__(self, source, mountpoint):
+    def __init__(self, source, mountpoint, workers=DEFAULT_WORKERS, negative_timeout=NEGATIVE_TIMEOUT,
+                 read_cache=None, readahead=READAHEAD_MAX, stats=None, union=None, placement="local"):
         self.source = source
         self.mountpoint = mountpoint
-        # Enable Union Logic only for /Users
-        self.is_union = (mountpoint == "/Users")
+        # Enable Union Logic only for /Users (unless forced, e.g. by the benchmark)
+        self.is_union = (mountpoint == "/Users") if union is None else union
+        self.cache = PathCache(negative_ttl=negative_timeout)
+        self.index = None
+
+        # Per-handle state: fh -> drive gate (None for local files)
+        self.gates = DriveGates(workers)
+        self.handles = {}
+        self.handles_lock = threading.Lock()
+        self.dir_handles = {}
+        self.dir_ids = itertools.count(1)
+        self.read_cache = read_cache
+
+        # Sequential read-ahead for roaming handles (fh -> ReadAhead)
+        self.readahead = readahead
+        self.readers = {}
+        self.prefetcher = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="zenfs-readahead") if readahead else None
+
+        # Instrumentation: the resolution source of the current op is stashed per thread
+        self.stats = stats
+        self.local = threading.local()
+        self.stat_blobs = {} # fh -> snapshot served through /.zenfs-stats
+
+        self.placement = placement
+        self.free_space = (0, None) # (checked_at, uuid) for the emptiest policy
+
+        if self.is_union:
+            threading.Thread(target=watch_mounts, args=(self._layout_changed,), daemon=True).start()
+            # Ghost DB tells us which drive owns each entry, skipping the probe loop
+            self.index = GhostIndex()
+            self.index.load()
+            self.index.watch()
+
+    def _layout_changed(self):
+        self.cache.clear()
+        self.free_space = (0, None)
+        if self.read_cache:
+            self.read_cache.drop_drives(set(mounted_drives()))
+
+    def __call__(self, op, *args):
+        if not self.stats:
+            return super().__call__(op, *args)
+
+        self.local.source = None
+        start = time.perf_counter_ns()
+        failed = True
+        try:
+            result = super().__call__(op, *args)
+            failed = False
+        finally:
+            if failed or op != 'readdir':
+                self.stats.record(op, self.local.source or "none", time.perf_counter_ns() - start, failed)
+        if op == 'readdir':
+            return self.stats.timed(result, op, "union" if self.is_union else "local", start)
+        return result
 
     def _get_real_path(self, path):
+        if not self.is_union:
+            self.local.source = "local"
+            return os.path.join(self.source, path.lstrip("/")), "local"
+
+        hit = self.cache.get(path)
+        if hit is None:
+            hit = self._resolve(path)
+            self.cache.put(path, *hit)
+        self.local.source = hit[1]
+        return hit
+
+    def _with_real_path(self, path, fn):
+        """Runs fn(real_path), re-resolving once if the cached target vanished (e.g. offloaded)."""
+        for attempt in (0, 1):
+            real_path, source = self._get_real_path(path)
+            if source == "missing":
+                raise fuse.FuseOSError(errno.ENOENT)
+            try:
+                return fn(real_path)
+            except FileNotFoundError:
+                if attempt: raise
+                self.cache.invalidate(path)
+
+    def _register(self, fh, real_path, flags=os.O_RDONLY):
+        gate = self.gates.for_path(real_path)
+        reader = None
+        if gate is not None and self.readahead and flags & os.O_ACCMODE != os.O_WRONLY:
+            reader = ReadAhead(fh, self.prefetcher, gate, max_window=self.readahead)
+        with self.handles_lock:
+            self.handles[fh] = gate
+            if reader: self.readers[fh] = reader
+        return fh
+
+    def _gate(self, fh):
+        gate = self.handles.get(fh)
+        return gate if gate is not None else nullcontext()
+
+    def _resolve(self, path):
         # path is relative to mount point (e.g., /Documents/file.txt)
         
         # 1. Check Local Source (Mirror)
         # e.g. /home/Documents/file.txt or /nix/store/...
         local_path = os.path.join(self.source, path.lstrip("/"))
         
-        # If simple mirror, or if file exists locally, return local
-        if not self.is_union:
-            return local_path, "local"
-        
         if os.path.exists(local_path):
             return local_path, "local"
 
-        # 2. Check Roaming Logic (Union Mode Only)
-        # Check all mounted roaming drives for the file
+        # 2. Ask the Ghost DB which drive owns the path (single stat)
+        rel = path.strip("/")
+        uuid = self.index.lookup(rel) if self.index else None
+        if uuid and uuid not in (".", "system"):
+            roaming_target = os.path.join(ROAMING_ROOT, uuid, "Users", rel)
+            if os.path.exists(roaming_target):
+                return roaming_target, "roaming"
+
+        # 3. Check Roaming Logic (Union Mode Only)
+        # Fallback for paths the DB doesn't know yet (or shared dirs living on several drives)
         parts = path.strip("/").split("/")
         if len(parts) >= 1:
             if ROAMING_ROOT.exists():
@@ -44,31 +353,44 @@ class ZenFS(fuse.Operations):
     # --- Filesystem Operations ---
 
     def getattr(self, path, fh=None):
-        real_path, source = self._get_real_path(path)
-        
-        if source == "missing":
-            raise fuse.FuseOSError(errno.ENOENT)
-
-        st = os.lstat(real_path)
+        if path == STATS_PATH and self.stats:
+            return dict(st_mode=(stat.S_IFREG | 0o444), st_nlink=1, st_size=0,
+                        st_atime=self.stats.started, st_mtime=self.stats.started, st_ctime=self.stats.started)
+        st = self._with_real_path(path, os.lstat)
         return dict((key, getattr(st, key)) for key in ('st_atime', 'st_ctime',
                      'st_gid', 'st_mode', 'st_mtime', 'st_nlink', 'st_size', 'st_uid'))
 
-    def readdir(self, path, fh):
-        dirents = ['.', '..']
-        
-        # 1. List Local Files
-        local_path = os.path.join(self.source, path.lstrip("/"))
-        if os.path.exists(local_path):
-            dirents.extend(os.listdir(local_path))
-            
-        # 2. List Roaming Files (Union Mode Only)
-        if self.is_union and ROAMING_ROOT.exists():
-            for drive in ROAMING_ROOT.iterdir():
-                roaming_target = drive / "Users" / path.lstrip("/")
-                if roaming_target.exists() and roaming_target.is_dir():
-                    dirents.extend(os.listdir(roaming_target))
+    def _dir_sources(self, path):
+        rel = path.lstrip("/")
+        sources = [os.path.join(self.source, rel)]
         
-        return list(set(dirents))
+        # Roaming Files (Union Mode Only)
+        if self.is_union:
+            try:
+                drives = os.listdir(ROAMING_ROOT)
+            except OSError:
+                drives = []
+            sources.extend(os.path.join(ROAMING_ROOT, drive, "Users", rel) for drive in drives)
+        return sources
+
+    def opendir(self, path):
+        stream = DirStream(self._dir_sources(path))
+        with self.handles_lock:
+            fh = next(self.dir_ids)
+            self.dir_handles[fh] = stream
+        return fh
+
+    def readdir(self, path, fh, offset=0):
+        stream = self.dir_handles.get(fh)
+        if stream is None:
+            stream = DirStream(self._dir_sources(path))
+        return stream.read(offset)
+
+    def releasedir(self, path, fh):
+        with self.handles_lock:
+            stream = self.dir_handles.pop(fh, None)
+        if stream: stream.close()
+        return 0
 
     def readlink(self, path):
         real_path, _ = self._get_real_path(path)
@@ -82,47 +404,207 @@ class ZenFS(fuse.Operations):
     # --- File Methods (Passthrough) ---
 
     def open(self, path, flags):
-        real_path, source = self._get_real_path(path)
-        if source == "missing": raise fuse.FuseOSError(errno.ENOENT)
-        return os.open(real_path, flags)
+        if path == STATS_PATH and self.stats:
+            # Snapshot per open; a /dev/null fd gives us a unique handle number
+            fh = os.open(os.devnull, os.O_RDONLY)
+            self.stat_blobs[fh] = self.stats.dump()
+            return fh
+        return self._with_real_path(path, lambda real_path: self._open_real(real_path, flags))
+
+    def _open_real(self, real_path, flags):
+        if self.read_cache:
+            if flags & os.O_ACCMODE != os.O_RDONLY:
+                self.read_cache.invalidate(real_path)
+            else:
+                # Hot roaming files are served from their local copy
+                cached = self.read_cache.lookup(real_path)
+                if cached:
+                    try:
+                        return self._register(os.open(cached, flags), cached, flags)
+                    except FileNotFoundError:
+                        pass # Evicted in between
+        return self._register(os.open(real_path, flags), real_path, flags)
 
+    # Positional I/O: no shared file offset, so concurrent requests on one fh are safe
     def read(self, path, length, offset, fh):
-        os.lseek(fh, offset, os.SEEK_SET)
-        return os.read(fh, length)
+        blob = self.stat_blobs.get(fh)
+        if blob is not None: return blob[offset:offset + length]
+
+        self.local.source = "local" if self.handles.get(fh) is None else "roaming"
+        reader = self.readers.get(fh)
+        if reader: return reader.read(length, offset)
+        with self._gate(fh):
+            return os.pread(fh, length, offset)
 
     def write(self, path, buf, offset, fh):
-        os.lseek(fh, offset, os.SEEK_SET)
-        return os.write(fh, buf)
+        self.local.source = "local" if self.handles.get(fh) is None else "roaming"
+        reader = self.readers.get(fh)
+        if reader: reader.invalidate()
+        with self._gate(fh):
+            return os.pwrite(fh, buf, offset)
 
     def release(self, path, fh):
+        with self.handles_lock:
+            self.handles.pop(fh, None)
+            self.stat_blobs.pop(fh, None)
+            reader = self.readers.pop(fh, None)
+        if reader:
+            reader.close()
+            summary = reader.report()
+            if summary: print(f"{path}: {summary}")
         return os.close(fh)
     
+    def _emptiest_drive(self):
+        checked_at, uuid = self.free_space
+        if time.monotonic() - checked_at < FREE_SPACE_TTL: return uuid
+
+        best, best_free = None, 0
+        for drive in mounted_drives():
+            try:
+                st = os.statvfs(os.path.join(ROAMING_ROOT, drive))
+            except OSError:
+                continue
+            free = st.f_bavail * st.f_frsize
+            if free > best_free: best, best_free = drive, free
+        self.free_space = (time.monotonic(), best)
+        return best
+
+    def _place(self, path):
+        """Picks where a new entry is created. Returns (real_path, uuid); uuid is None for local."""
+        real_path, source = self._get_real_path(path)
+        rel = path.strip("/")
+        # Existing paths stay put; user directories themselves always live locally
+        if source != "missing" or self.placement == "local" or not self.is_union or "/" not in rel:
+            return real_path, None
+
+        uuid = None
+        if self.placement == "parent":
+            parent_real, parent_source = self._get_real_path("/" + rel.rpartition("/")[0])
+            if parent_source == "roaming": uuid = drive_of(parent_real)
+        elif self.placement == "emptiest":
+            uuid = self._emptiest_drive()
+        if not uuid: return real_path, None
+
+        self._make_parents(rel, uuid)
+        return os.path.join(ROAMING_ROOT, uuid, "Users", rel), uuid
+
+    def _make_parents(self, rel, uuid):
+        """
+        Creates the parents of a placed entry missing on its drive, with the owner and mode
+        of the matching directories in the union view, and records them like the entry.
+        """
+        users_root = os.path.join(ROAMING_ROOT, uuid, "Users")
+        os.makedirs(users_root, exist_ok=True)
+        parts = rel.split("/")[:-1]
+        for depth in range(1, len(parts) + 1):
+            parent = "/".join(parts[:depth])
+            target = os.path.join(users_root, parent)
+            if os.path.isdir(target): continue
+            st = os.lstat(self._get_real_path("/" + parent)[0])
+            try:
+                os.mkdir(target)
+            except FileExistsError:
+                continue
+            os.chown(target, st.st_uid, st.st_gid)
+            os.chmod(target, stat.S_IMODE(st.st_mode)) # Not subject to the umask, unlike mkdir's mode
+            # The user directory itself is not an entry
+            if depth > 1: self._record_placement("/" + parent, uuid, True)
+
+    def _record_placement(self, path, uuid, is_dir):
+        """Writes Ghost DB entries for an entry we just placed on a roaming drive."""
+        rel = path.strip("/")
+        if self.index and self.index.lookup(rel) == uuid: return # Already covered by an ancestor
+        try:
+            record_entry(rel, uuid, is_dir)
+            if self.index: self.index.update(rel, uuid)
+        except OSError as e:
+            print(f"Failed to record {rel} in Ghost DB: {e}")
+
     def create(self, path, mode, fi=None):
-        real_path, _ = self._get_real_path(path)
-        return os.open(real_path, os.O_WRONLY | os.O_CREAT, mode)
+        real_path, uuid = self._place(path)
+        try:
+            fh = self._register(os.open(real_path, os.O_WRONLY | os.O_CREAT, mode), real_path, os.O_WRONLY)
+        finally:
+            self.cache.invalidate(path)
+        if uuid: self._record_placement(path, uuid, False)
+        return fh
 
     def unlink(self, path):
         real_path, _ = self._get_real_path(path)
-        return os.unlink(real_path)
+        try:
+            return os.unlink(real_path)
+        finally:
+            self.cache.invalidate(path)
 
     def rmdir(self, path):
         real_path, _ = self._get_real_path(path)
-        return os.rmdir(real_path)
+        try:
+            return os.rmdir(real_path)
+        finally:
+            self.cache.invalidate(path)
 
     def mkdir(self, path, mode):
-        real_path, _ = self._get_real_path(path)
-        return os.mkdir(real_path, mode)
+        real_path, uuid = self._place(path)
+        try:
+            os.mkdir(real_path, mode)
+        finally:
+            self.cache.invalidate(path)
+        if uuid: self._record_placement(path, uuid, True)
 
 def main():
-    if len(sys.argv) < 3:
-        print("Usage: zenfs-fuse <mirror_source> <mount_point>")
-        sys.exit(1)
-    
-    source = sys.argv[1]
-    mountpoint = sys.argv[2]
+    parser = argparse.ArgumentParser(prog="zenfs-fuse")
+    parser.add_argument("source", help="Mirror source (e.g. /home)")
+    parser.add_argument("mountpoint", help="Mount point (e.g. /Users)")
+    parser.add_argument("--union", action="store_true",
+                        help="Force union mode on a mount point other than /Users")
+    parser.add_argument("--placement", choices=PLACEMENT_POLICIES, default="local",
+                        help="Where new files and directories created through the union are stored")
+    parser.add_argument("--threaded", action="store_true",
+                        help="Serve requests from multiple threads so slow drives don't stall local I/O")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Concurrent I/O operations allowed per roaming drive (threaded mode)")
+    parser.add_argument("--attr-timeout", type=float, default=ATTR_TIMEOUT,
+                        help="Seconds the kernel may cache file attributes")
+    parser.add_argument("--entry-timeout", type=float, default=ENTRY_TIMEOUT,
+                        help="Seconds the kernel may cache name lookups")
+    parser.add_argument("--negative-timeout", type=float, default=NEGATIVE_TIMEOUT,
+                        help="Seconds a missing name is cached (kernel and ZenFS); 0 disables")
+    parser.add_argument("--read-cache-size", type=int, default=0,
+                        help="MiB of local disk used to cache hot roaming files; 0 disables")
+    parser.add_argument("--read-cache-dir", default=str(READ_CACHE_ROOT),
+                        help="Where cached copies of roaming files are kept")
+    parser.add_argument("--readahead", type=int, default=READAHEAD_MAX // 1024,
+                        help="Largest read-ahead window in KiB for sequential roaming reads; 0 disables")
+    parser.add_argument("--max-io", type=int, default=MAX_IO // 1024,
+                        help="Largest single read/write request in KiB negotiated with the kernel")
+    parser.add_argument("--no-stats", action="store_true",
+                        help=f"Disable per-operation latency stats (served at {STATS_PATH})")
+    parser.add_argument("--stats-interval", type=int, default=0,
+                        help="Also print a stats snapshot to the journal every N seconds; 0 disables")
+    args = parser.parse_args()
     
+    read_cache = None
+    if args.read_cache_size > 0:
+        read_cache = RoamingReadCache(args.read_cache_size * 1024 * 1024, root=args.read_cache_dir)
+
+    stats = None
+    if not args.no_stats:
+        stats = OpStats()
+        if args.stats_interval > 0:
+            threading.Thread(target=dump_periodically, args=(stats, args.stats_interval), daemon=True).start()
+
+    ops = ZenFS(args.source, args.mountpoint, workers=max(1, args.workers),
+                negative_timeout=args.negative_timeout, read_cache=read_cache,
+                readahead=args.readahead * 1024, stats=stats, union=args.union or None,
+                placement=args.placement)
     # allow_other is crucial for system visibility
-    fuse.FUSE(ZenFS(source, mountpoint), mountpoint, nothreads=True, foreground=True, allow_other=True)
+    # After a detach the kernel may serve stale entries for at most these timeouts;
+    # our own caches are flushed as soon as the mount table changes.
+    ZenFUSE(ops, args.mountpoint, nothreads=not args.threaded, foreground=True, allow_other=True,
+            attr_timeout=args.attr_timeout, entry_timeout=args.entry_timeout,
+            negative_timeout=args.negative_timeout,
+            big_writes=True, max_read=args.max_io * 1024, max_write=args.max_io * 1024,
+            max_readahead=KERNEL_READAHEAD)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
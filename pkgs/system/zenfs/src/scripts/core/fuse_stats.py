@@ -0,0 +1,78 @@
+# File: src/scripts/core/fuse_stats.py
+import json
+import time
+import threading
+
+STATS_PATH = "/.zenfs-stats"
+BUCKETS = 24 # log2 microsecond buckets: <1us, <2us, ... <2^22us (~4s), overflow
+
+class OpStats:
+    """
+    Per-operation counters for the ZenFS FUSE layer, keyed by (operation, source).
+    Recording is a bit_length and a few list increments under one lock, cheap enough
+    to leave on in production; percentiles are derived from the histogram on read.
+    """
+    def __init__(self):
+        self.started = time.time()
+        self.data = {} # (op, source) -> [count, errors, total_ns, histogram]
+        self.lock = threading.Lock()
+
+    def record(self, op, source, elapsed_ns, failed):
+        bucket = min((elapsed_ns // 1000).bit_length(), BUCKETS - 1)
+        key = (op, source)
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                entry = self.data[key] = [0, 0, 0, [0] * BUCKETS]
+            entry[0] += 1
+            entry[1] += failed
+            entry[2] += elapsed_ns
+            entry[3][bucket] += 1
+
+    def timed(self, gen, op, source, start):
+        """Wraps a generator result (readdir) so its latency covers the full iteration."""
+        failed = True
+        try:
+            yield from gen
+            failed = False
+        except GeneratorExit:
+            failed = False
+            raise
+        finally:
+            self.record(op, source, time.perf_counter_ns() - start, failed)
+
+    def snapshot(self):
+        with self.lock:
+            data = {key: (c, e, t, list(h)) for key, (c, e, t, h) in self.data.items()}
+
+        ops = {}
+        for (op, source), (count, errors, total_ns, hist) in sorted(data.items()):
+            ops.setdefault(op, {})[source] = {
+                "count": count,
+                "errors": errors,
+                "mean_us": round(total_ns / count / 1000, 1) if count else 0,
+                "p50_us": _percentile(hist, count, 0.50),
+                "p99_us": _percentile(hist, count, 0.99),
+                # Upper bound of each bucket in microseconds -> samples
+                "histogram_us": {str(1 << i): n for i, n in enumerate(hist) if n},
+            }
+        return {"started": int(self.started), "uptime": round(time.time() - self.started), "ops": ops}
+
+    def dump(self):
+        return (json.dumps(self.snapshot(), indent=2) + "\n").encode()
+
+def _percentile(hist, count, fraction):
+    """Upper bound (us) of the bucket holding the given fraction of samples."""
+    if not count: return 0
+    target = count * fraction
+    seen = 0
+    for i, n in enumerate(hist):
+        seen += n
+        if seen >= target: return 1 << i
+    return 1 << (BUCKETS - 1)
+
+def dump_periodically(stats, interval):
+    """Writes a compact snapshot to stdout (the journal under systemd) every `interval` seconds."""
+    while True:
+        time.sleep(interval)
+        print(f"ZenFS stats: {json.dumps(stats.snapshot(), separators=(',', ':'))}", flush=True)
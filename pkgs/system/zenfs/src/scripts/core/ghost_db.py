@@ -0,0 +1,520 @@
+# File: src/scripts/core/ghost_db.py
+import os
+import json
+import fcntl
+import shutil
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from contextlib import contextmanager, nullcontext
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+from common import DB_ROOT, ROAMING_ROOT
+
+# Directories in the Ghost Database carry their owner UUID in this marker file
+FOLDER_MARKER = ".zenfs-folder"
+
+# --- Reading ---
+def read_owner(ghost_path):
+    """Returns the drive UUID recorded by a Ghost DB entry (file or folder), or None."""
+    try:
+        if os.path.isdir(ghost_path):
+            ghost_path = os.path.join(ghost_path, FOLDER_MARKER)
+        with open(ghost_path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def iter_entries(db_root):
+    """
+    Walks a Ghost Database and yields (relative_path, uuid, is_dir) for every entry.
+    Relative paths are '/'-joined and start with the user (e.g. 'doromiert/Music').
+    """
+    db_root = str(db_root)
+    for root, _, files in os.walk(db_root):
+        rel_root = os.path.relpath(root, db_root)
+        if rel_root == ".":
+            continue # Top level only holds user directories
+
+        if FOLDER_MARKER in files:
+            uuid = read_owner(os.path.join(root, FOLDER_MARKER))
+            if uuid: yield rel_root, uuid, True
+
+        for name in files:
+            if name == FOLDER_MARKER: continue
+            uuid = read_owner(os.path.join(root, name))
+            if uuid: yield f"{rel_root}/{name}", uuid, False
+
+def drive_db_root(drive_root):
+    """Location of the Ghost Database on a drive (mounted at `drive_root`)."""
+    return Path(drive_root) / "System/ZenFS/Database"
+
+def write_entry(db_root, rel, uuid, is_dir):
+    """Creates (or re-points) one tree-layout Ghost DB entry under `db_root`."""
+    ghost = Path(db_root) / rel
+    if is_dir:
+        ghost.mkdir(parents=True, exist_ok=True)
+        (ghost / FOLDER_MARKER).write_text(uuid)
+    else:
+        ghost.parent.mkdir(parents=True, exist_ok=True)
+        ghost.write_text(uuid)
+
+# --- Storage Formats ---
+# tree:   <Database>/<user>/<path> files holding the UUID, '.zenfs-folder' markers in dirs
+# sqlite: <Database>.sqlite, one sorted (WITHOUT ROWID) table keyed by relative path,
+#         read through SQLite's mmap so lookups don't pay a syscall per entry
+class TreeStore:
+    format = "tree"
+
+    def __init__(self, db_root):
+        self.root = Path(db_root)
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+    def close(self): pass
+    def batch(self): return nullcontext()
+
+    def exists(self):
+        return self.root.is_dir()
+
+    def entries(self):
+        return iter_entries(self.root)
+
+    def get(self, rel):
+        """Returns (uuid, is_dir) for an entry, or None."""
+        ghost = self.root / rel
+        uuid = read_owner(ghost)
+        return (uuid, ghost.is_dir()) if uuid else None
+
+    def contains(self, rel):
+        return os.path.lexists(self.root / rel)
+
+    def top_level(self):
+        """
+        Yields (user, name, uuid, is_dir) for every top-level entry (types straight from
+        d_type). Directories without a marker are just parents of nested entries, not entries.
+        """
+        if not self.root.is_dir(): return
+        for user_entry in os.scandir(self.root):
+            if not user_entry.is_dir(follow_symlinks=False): continue
+            with os.scandir(user_entry.path) as it:
+                for e in it:
+                    uuid = read_owner(e.path)
+                    if uuid: yield user_entry.name, e.name, uuid, e.is_dir(follow_symlinks=False)
+
+    def listing(self):
+        """Top-level entries per user: {user: {name: is_dir}}."""
+        listing = {}
+        for user, name, _, is_dir in self.top_level():
+            listing.setdefault(user, {})[name] = is_dir
+        return listing
+
+    def put(self, rel, uuid, is_dir):
+        write_entry(self.root, rel, uuid, is_dir)
+
+    def put_many(self, entries, workers=8):
+        """Writes (rel, uuid, is_dir) entries; each is a mkdir + small write, so run them in parallel."""
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for _ in pool.map(lambda e: write_entry(self.root, *e), entries): pass
+
+    def delete(self, rel):
+        """Removes an entry and everything beneath it."""
+        ghost = self.root / rel
+        if ghost.is_dir() and not ghost.is_symlink(): shutil.rmtree(ghost)
+        elif os.path.lexists(ghost): ghost.unlink()
+
+    def clear(self):
+        if self.root.exists(): shutil.rmtree(self.root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def destroy(self):
+        if self.root.exists(): shutil.rmtree(self.root)
+
+class SqliteStore:
+    format = "sqlite"
+    MMAP_SIZE = 256 * 1024 * 1024
+
+    def __init__(self, db_root):
+        self.root = Path(db_root)
+        self.path = sqlite_path(db_root)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.existed = self.path.exists() # connect() creates the file
+        # Shared between FUSE worker threads; all access goes through self.lock
+        self.conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA mmap_size={self.MMAP_SIZE}")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS entries ("
+                          "path TEXT PRIMARY KEY, uuid TEXT NOT NULL, is_dir INTEGER NOT NULL) WITHOUT ROWID")
+        self.lock = threading.RLock()
+        self.in_batch = False
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    @contextmanager
+    def batch(self):
+        """Groups writes into one transaction (one fsync instead of one per entry)."""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.in_batch = True
+            try:
+                yield self
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            finally:
+                self.in_batch = False
+
+    def exists(self):
+        return self.existed
+
+    def entries(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT path, uuid, is_dir FROM entries ORDER BY path").fetchall()
+        return ((path, uuid, bool(is_dir)) for path, uuid, is_dir in rows)
+
+    def get(self, rel):
+        with self.lock:
+            row = self.conn.execute("SELECT uuid, is_dir FROM entries WHERE path = ?", (rel,)).fetchone()
+        return (row[0], bool(row[1])) if row else None
+
+    def contains(self, rel):
+        lo, hi = _subtree_bounds(rel)
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM entries WHERE path = ? OR (path >= ? AND path < ?) LIMIT 1",
+                                    (rel, lo, hi)).fetchone()
+        return row is not None
+
+    def top_level(self):
+        for path, uuid, is_dir in self.entries():
+            user, _, name = path.partition("/")
+            if name and "/" not in name: yield user, name, uuid, is_dir
+
+    def listing(self):
+        listing = {}
+        for user, name, _, is_dir in self.top_level():
+            listing.setdefault(user, {})[name] = is_dir
+        return listing
+
+    def put(self, rel, uuid, is_dir):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO entries (path, uuid, is_dir) VALUES (?, ?, ?)",
+                              (rel, uuid, int(is_dir)))
+            self.existed = True
+
+    def put_many(self, entries, workers=None):
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO entries (path, uuid, is_dir) VALUES (?, ?, ?)",
+                                  ((rel, uuid, int(is_dir)) for rel, uuid, is_dir in entries))
+            self.existed = True
+
+    def delete(self, rel):
+        lo, hi = _subtree_bounds(rel)
+        with self.lock:
+            self.conn.execute("DELETE FROM entries WHERE path = ? OR (path >= ? AND path < ?)", (rel, lo, hi))
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM entries")
+            self.existed = True
+
+    def destroy(self):
+        self.close()
+        for suffix in ("", "-wal", "-shm"):
+            try: os.unlink(str(self.path) + suffix)
+            except FileNotFoundError: pass
+
+def _subtree_bounds(rel):
+    # Paths under 'a/b' sort in ['a/b/', 'a/b0'): '0' is the character after '/'
+    return rel + "/", rel + "0"
+
+def sqlite_path(db_root):
+    return Path(str(db_root) + ".sqlite")
+
+def db_exists(db_root):
+    return sqlite_path(db_root).exists() or Path(db_root).is_dir()
+
+def detect_format(db_root):
+    return "sqlite" if sqlite_path(db_root).exists() else "tree"
+
+def open_db(db_root, fmt=None):
+    """
+    Opens a Ghost Database in whatever format is on disk. New databases follow `fmt`,
+    falling back to the system DB's format so a converted machine stays consistent.
+    """
+    if fmt is None:
+        if db_exists(db_root):
+            fmt = detect_format(db_root)
+        else:
+            fmt = detect_format(DB_ROOT)
+    return SqliteStore(db_root) if fmt == "sqlite" else TreeStore(db_root)
+
+def convert(db_root, fmt):
+    """Rewrites a Ghost Database into `fmt` ('tree' or 'sqlite') and removes the old copy."""
+    with open_db(db_root) as src:
+        if src.format == fmt:
+            print(f"{db_root} is already in {fmt} format.")
+            return
+        entries = list(src.entries())
+        if fmt == "tree":
+            src.destroy() # Same directory the tree will occupy
+        dst = SqliteStore(db_root) if fmt == "sqlite" else TreeStore(db_root)
+        with dst:
+            dst.clear()
+            with dst.batch():
+                dst.put_many(entries)
+        if fmt == "sqlite":
+            src.destroy()
+    print(f"Converted {db_root} to {fmt} ({len(entries)} entries).")
+
+# --- Change Journal ---
+# Drive databases carry <Database>.journal (one JSON line per change, tagged with an
+# increasing generation) and <Database>.generation ('<epoch> <gen>'). Readers remember
+# the (epoch, gen) they merged up to; a new epoch (full rebuild, compaction) means the
+# journal no longer covers that position and the reader has to merge everything.
+JOURNAL_MAX = 4 * 1024 * 1024
+
+class Journal:
+    def __init__(self, db_root):
+        self.path = Path(str(db_root) + ".journal")
+        self.head_path = Path(str(db_root) + ".generation")
+
+    @contextmanager
+    def _locked(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX) # watcher, offload and rebuilds write concurrently
+            yield f
+
+    def head(self):
+        """Returns (epoch, generation) of the last change, or None for a database without a journal."""
+        try:
+            epoch, gen = self.head_path.read_text().split()
+            return epoch, int(gen)
+        except (OSError, ValueError):
+            return None
+
+    def _set_head(self, epoch, gen):
+        tmp = self.head_path.with_suffix(".tmp")
+        tmp.write_text(f"{epoch} {gen}")
+        os.replace(tmp, self.head_path)
+
+    def append(self, changes):
+        """Logs [(op, rel, uuid, is_dir)] with op 'put' or 'delete'."""
+        if not changes: return
+        with self._locked() as f:
+            epoch, gen = self.head() or (None, 0)
+            if epoch is None or f.tell() > JOURNAL_MAX:
+                # Start over; readers of the old epoch fall back to a full merge
+                f.truncate(0)
+                epoch = os.urandom(8).hex()
+            else:
+                f.write("".join(json.dumps({"gen": gen + i + 1, "op": op, "path": rel, "uuid": uuid, "dir": is_dir}) + "\n"
+                                for i, (op, rel, uuid, is_dir) in enumerate(changes)))
+                f.flush()
+            self._set_head(epoch, gen + len(changes))
+
+    def reset(self):
+        """Drops the history (after a full rebuild), forcing readers to merge everything."""
+        with self._locked() as f:
+            _, gen = self.head() or (None, 0)
+            f.truncate(0)
+            self._set_head(os.urandom(8).hex(), gen + 1)
+
+    def since(self, epoch, gen):
+        """Returns (changes after `gen`, new head), or None if the journal can't bridge the gap."""
+        with self._locked() as f:
+            head = self.head()
+            if not head or head[0] != epoch or head[1] < gen: return None
+            f.seek(0)
+            changes = []
+            for line in f:
+                record = json.loads(line)
+                if record["gen"] > gen:
+                    changes.append((record["op"], record["path"], record["uuid"], record["dir"]))
+            if len(changes) != head[1] - gen: return None # Truncated or torn journal
+            return changes, head
+
+# --- Writing ---
+def record_entry(rel, uuid, is_dir):
+    """Records `rel` on the owning drive's database and mirrors it into the system DB."""
+    db_root = drive_db_root(ROAMING_ROOT / uuid)
+    with open_db(db_root) as db:
+        db.put(rel, uuid, is_dir)
+    Journal(db_root).append([("put", rel, uuid, is_dir)])
+    with open_db(DB_ROOT) as db:
+        db.put(rel, uuid, is_dir)
+
+def remove_entry(rel, uuid):
+    """Drops `rel` from the owning drive's database and from the system DB."""
+    db_root = drive_db_root(ROAMING_ROOT / uuid)
+    if db_exists(db_root):
+        with open_db(db_root) as db:
+            db.delete(rel)
+        Journal(db_root).append([("delete", rel, None, None)])
+    if db_exists(DB_ROOT):
+        with open_db(DB_ROOT) as db:
+            db.delete(rel)
+
+# --- Prefix Index ---
+class GhostIndex:
+    """
+    In-memory map of '<user>/<path>' -> owning drive UUID, loaded from the Ghost Database.
+    Lookups walk up the path so nested entries (e.g. single offloaded files) win over
+    the top-level directory that contains them.
+    """
+    def __init__(self, db_root=DB_ROOT):
+        self.db_root = Path(db_root)
+        self.owners = {}
+        self.lock = threading.Lock()
+
+    def load(self):
+        with open_db(self.db_root) as db:
+            owners = {rel: uuid for rel, uuid, _ in db.entries()}
+        with self.lock:
+            self.owners = owners
+        print(f"Ghost index loaded: {len(owners)} entries.")
+
+    def lookup(self, rel):
+        """Returns the UUID owning `rel` (or its closest recorded ancestor), or None."""
+        owners = self.owners
+        while rel:
+            uuid = owners.get(rel)
+            if uuid is not None: return uuid
+            rel = rel.rpartition("/")[0]
+        return None
+
+    def update(self, rel, uuid):
+        with self.lock:
+            self.owners[rel] = uuid
+
+    def remove(self, rel):
+        """Drops `rel` and everything recorded beneath it."""
+        prefix = rel + "/"
+        with self.lock:
+            self.owners.pop(rel, None)
+            for key in [k for k in self.owners if k.startswith(prefix)]:
+                del self.owners[key]
+
+    def watch(self):
+        """Follows the on-disk database so the index tracks watcher/offload/roaming updates."""
+        def schedule():
+            if detect_format(self.db_root) == "sqlite":
+                observer.schedule(ReloadHandler(self, sqlite_path(self.db_root)), str(self.db_root.parent))
+            else:
+                observer.schedule(GhostIndexHandler(self), str(self.db_root), recursive=True)
+
+        observer = Observer()
+        observer.daemon = True
+        if not db_exists(self.db_root):
+            return watch_until_exists(observer, self.db_root, lambda: (schedule(), self.load()))
+        schedule()
+        observer.start()
+        return observer
+
+class GhostIndexHandler(FileSystemEventHandler):
+    def __init__(self, index):
+        self.index = index
+
+    def _rel(self, path):
+        rel = os.path.relpath(path, self.index.db_root)
+        if rel == "." or rel.startswith(".."): return None
+        if os.path.basename(rel) == FOLDER_MARKER:
+            rel = os.path.dirname(rel)
+        return rel
+
+    def _record(self, path, is_dir):
+        if is_dir:
+            # Moved-in directories arrive as a single event; index their contents too
+            for root, _, files in os.walk(path):
+                for name in files:
+                    self._record(os.path.join(root, name), False)
+            return
+        rel = self._rel(path)
+        if not rel or "/" not in rel: return # User directories carry no owner
+        uuid = read_owner(path)
+        if uuid: self.index.update(rel, uuid)
+
+    def on_created(self, event):
+        self._record(event.src_path, event.is_directory)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._record(event.src_path, False)
+
+    def on_deleted(self, event):
+        rel = self._rel(event.src_path)
+        if rel: self.index.remove(rel)
+
+    def on_moved(self, event):
+        self.on_deleted(event)
+        self._record(event.dest_path, event.is_directory)
+
+class ReloadHandler(FileSystemEventHandler):
+    """Calls `target.load()` shortly after files under `prefix` stop changing."""
+    DEBOUNCE = 0.5
+
+    def __init__(self, target, prefix):
+        self.target = target
+        self.prefix = str(prefix)
+        self.timer = None
+        self.lock = threading.Lock()
+
+    def on_any_event(self, event):
+        if not event.src_path.startswith(self.prefix): return
+        with self.lock:
+            if self.timer: self.timer.cancel()
+            self.timer = threading.Timer(self.DEBOUNCE, self.target.load)
+            self.timer.daemon = True
+            self.timer.start()
+
+class AppearHandler(FileSystemEventHandler):
+    """Calls `on_appear()` once, when a database that didn't exist yet shows up."""
+    def __init__(self, db_root, on_appear):
+        self.db_root = db_root
+        self.on_appear = on_appear
+        self.fired = False
+        self.lock = threading.Lock()
+
+    def on_any_event(self, event):
+        if not db_exists(self.db_root): return
+        with self.lock:
+            if self.fired: return
+            self.fired = True
+        self.on_appear()
+
+def watch_until_exists(observer, db_root, on_appear):
+    """
+    Starts `observer` on the directory that will hold the database at `db_root` and calls
+    `on_appear()` (which should schedule the real watch and load) once it is created.
+    """
+    parent = Path(db_root).parent
+    parent.mkdir(parents=True, exist_ok=True)
+    handler = AppearHandler(db_root, on_appear)
+    observer.schedule(handler, str(parent))
+    observer.start()
+    handler.on_any_event(None) # Created before the watch was in place
+    return observer
+
+def watch_db(target, db_root):
+    """Reloads `target` whenever the database at `db_root` changes (either format) or first appears."""
+    def schedule():
+        if detect_format(db_root) == "sqlite":
+            # The compact DB (or its WAL) changes: watch the directory holding it
+            observer.schedule(ReloadHandler(target, sqlite_path(db_root)), str(Path(db_root).parent))
+        else:
+            observer.schedule(ReloadHandler(target, db_root), str(db_root), recursive=True)
+
+    observer = Observer()
+    observer.daemon = True
+    if not db_exists(db_root):
+        return watch_until_exists(observer, db_root, lambda: (schedule(), target.load()))
+    schedule()
+    observer.start()
+    return observer
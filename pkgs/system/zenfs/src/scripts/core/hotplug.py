@@ -0,0 +1,150 @@
+# File: src/scripts/core/hotplug.py
+import os
+import socket
+import struct
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from common import ROAMING_ROOT, mount_table
+from checker import skip_reason
+from roaming_service import request_sync
+import attach
+import detach
+
+NETLINK_KOBJECT_UEVENT = 15
+UDEV_GROUP = 2 # Events re-broadcast by udev after probing (carry ID_FS_* properties)
+UDEV_MAGIC = 0xfeedcafe
+QUEUE_SIZE = 64
+WORKERS = 4
+RCVBUF = 4 * 1024 * 1024 # Absorb a hub full of drives arriving at once
+
+# --- Uevents ---
+def parse_uevent(data):
+    """Returns the property dict of a udev (libudev header) or raw kernel uevent."""
+    if data.startswith(b"libudev\0"):
+        # Magic is big-endian, the offsets are in host order
+        (magic,) = struct.unpack_from("!I", data, 8)
+        _, props_off, props_len = struct.unpack_from("=III", data, 12)
+        if magic != UDEV_MAGIC: return {}
+        data = data[props_off:props_off + props_len]
+    else:
+        data = data.partition(b"\0")[2] # Drop the 'action@devpath' header
+    props = {}
+    for field in data.split(b"\0"):
+        key, sep, value = field.partition(b"=")
+        if sep: props[key.decode(errors="replace")] = value.decode(errors="replace")
+    return props
+
+def open_uevent_socket():
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RCVBUF)
+    sock.bind((os.getpid(), UDEV_GROUP))
+    return sock
+
+def classify(props):
+    """Maps a uevent to (device name, 'attach' | 'detach') or None if it's not for us."""
+    if props.get("SUBSYSTEM") != "block" or not props.get("DEVNAME"): return None
+    dev_name = Path(props["DEVNAME"]).name
+    action = props.get("ACTION")
+
+    if action == "remove":
+        return dev_name, "detach"
+    if action not in ("add", "change"): return None
+
+    dev = {
+        "kname": dev_name,
+        "type": "part" if props.get("DEVTYPE") == "partition" else props.get("DEVTYPE", "disk"),
+        "fstype": props.get("ID_FS_TYPE"),
+        "pttype": props.get("ID_PART_TABLE_TYPE"),
+    }
+    if skip_reason(dev): return None
+    return dev_name, "attach"
+
+# --- Work Queue ---
+class HotplugQueue:
+    """
+    Bounded, per-device deduplicated work queue. A device already waiting keeps its
+    place and just takes the newest action (add+remove collapses to remove); a device
+    being worked on is never handed to a second worker. When the queue drains, one
+    roaming sync covers everything the burst changed.
+    """
+    def __init__(self, maxsize=QUEUE_SIZE):
+        self.maxsize = maxsize
+        self.pending = OrderedDict() # dev_name -> action
+        self.active = set()
+        self.changed = []
+        self.cond = threading.Condition()
+
+    def put(self, dev_name, action):
+        with self.cond:
+            if dev_name not in self.pending and len(self.pending) >= self.maxsize:
+                print(f"Hotplug queue full, dropping {action} {dev_name} (the checker will pick it up).")
+                return
+            self.pending[dev_name] = action
+            self.cond.notify()
+
+    def _ready(self):
+        return next((d for d in self.pending if d not in self.active), None)
+
+    def get(self):
+        with self.cond:
+            self.cond.wait_for(lambda: self._ready() is not None)
+            dev_name = self._ready()
+            self.active.add(dev_name)
+            return dev_name, self.pending.pop(dev_name)
+
+    def done(self, dev_name, change):
+        """Marks a device finished; returns the burst's changes if this was the last one out."""
+        with self.cond:
+            self.active.discard(dev_name)
+            if change: self.changed.append(change)
+            self.cond.notify_all()
+            if self.pending or self.active or not self.changed: return None
+            changed, self.changed = self.changed, []
+            return changed
+
+def _detach_device(dev_name):
+    """Detaches whatever this (now gone) device had bound under ROAMING_ROOT."""
+    prefix = str(ROAMING_ROOT) + "/"
+    for target in mount_table().targets_of(f"/dev/{dev_name}"):
+        if target.startswith(prefix):
+            detach.detach(target, sync=False)
+            return target[len(prefix):]
+    return None
+
+def worker(queue):
+    while True:
+        dev_name, action = queue.get()
+        change = None
+        try:
+            if action == "attach":
+                uuid = attach.attach(dev_name, sync=False)
+                if uuid: change = f"attached {uuid}"
+            else:
+                uuid = _detach_device(dev_name)
+                if uuid: change = f"detached {uuid}"
+        except Exception as e:
+            print(f"Hotplug {action} failed on {dev_name}: {e}")
+        changed = queue.done(dev_name, change)
+        if changed:
+            # Burst over: one sync for all of it, without the service's own debounce
+            request_sync(", ".join(changed), immediate=True)
+
+def main():
+    print("ZenFS Hotplug: listening for block device uevents...")
+    sock = open_uevent_socket()
+    queue = HotplugQueue()
+    for _ in range(WORKERS):
+        threading.Thread(target=worker, args=(queue,), daemon=True).start()
+
+    while True:
+        try:
+            data = sock.recv(65536)
+        except OSError as e:
+            print(f"Uevent socket error: {e}") # ENOBUFS: events were dropped, keep going
+            continue
+        event = classify(parse_uevent(data))
+        if event: queue.put(*event)
+
+if __name__ == "__main__":
+    main()
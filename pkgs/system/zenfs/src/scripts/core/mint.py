@@ -5,14 +5,21 @@ import json
 from pathlib import Path
 from common import generate_zenfs_uuid, run_command, notify
 from db_builder import rebuild_drive_db
+import drive_cache
+from phase_trace import Tracer
 
 def mint(device, label, drive_type="roaming"):
+    span = Tracer("mint", Path(device).name)
+    with span.total():
+        _mint(device, label, drive_type, span)
+
+def _mint(device, label, drive_type, span):
     print(f"Minting {device} as {drive_type}...")
     temp_mount = Path("/tmp/zenfs_mint")
     temp_mount.mkdir(exist_ok=True)
     
     try:
-        run_command(f"mount {device} {temp_mount}")
+        with span("mount"): run_command(f"mount {device} {temp_mount}")
         
         uuid_str = generate_zenfs_uuid()
         data = {
@@ -29,7 +36,9 @@ def mint(device, label, drive_type="roaming"):
             json.dump(data, f, indent=2)
             
         # Immediately build DB so the drive is ready for use
-        rebuild_drive_db(temp_mount, uuid_str)
+        with span("rebuild-db"): rebuild_drive_db(temp_mount, uuid_str)
+        # Any cached "not ZenFS" verdict for this device is now wrong
+        drive_cache.forget(device)
             
         print(f"Drive minted with UUID: {uuid_str}")
         notify("ZenFS Mint", f"Minted {label}")
@@ -38,4 +47,4 @@ def mint(device, label, drive_type="roaming"):
         print(f"Mint error: {e}")
         notify("ZenFS Error", f"Mint failed: {e}")
     finally:
-        run_command(f"umount {temp_mount}")
\ No newline at end of file
+        with span("unmount"): run_command(f"umount {temp_mount}")
\ No newline at end of file
@@ -0,0 +1,122 @@
+# File: src/scripts/core/missing_fs.py
+import os
+import stat
+import time
+import errno
+import argparse
+import threading
+import fuse
+from common import DB_ROOT, ROAMING_ROOT, MISSING_ROOT, mount_table
+from ghost_db import open_db, db_exists, watch_db
+
+README_NAME = "README_INSERT_DRIVE.txt"
+LOCAL_OWNERS = (".", "system")
+
+class MissingDrivesFS(fuse.Operations):
+    """
+    Read-only view of the placeholders for absent drives, synthesised from the system DB:
+
+        /<UUID>/<User>/<Entry>                  file entries: a one-line notice
+        /<UUID>/<User>/<Entry>/README_INSERT_DRIVE.txt   directory entries
+
+    Nothing is written to disk, so syncing with a drive unplugged costs nothing.
+    """
+    def __init__(self, db_root=DB_ROOT):
+        self.db_root = db_root
+        self.started = time.time()
+        self.drives = {} # uuid -> {user: {name: is_dir}}
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        drives = {}
+        if db_exists(self.db_root):
+            with open_db(self.db_root) as db:
+                for user, name, uuid, is_dir in db.top_level():
+                    if uuid in LOCAL_OWNERS: continue
+                    drives.setdefault(uuid, {}).setdefault(user, {})[name] = is_dir
+        with self.lock:
+            self.drives = drives
+        print(f"Missing drives view: {sum(len(n) for u in drives.values() for n in u.values())} placeholders "
+              f"across {len(drives)} drives.")
+
+    # --- Layout ---
+    def _node(self, path):
+        """Returns (kind, uuid) for a virtual path; kind is 'dir', 'file' or 'readme'."""
+        parts = [p for p in path.split("/") if p]
+        if not parts: return "dir", None
+
+        drives = self.drives
+        users = drives.get(parts[0])
+        if users is None: raise fuse.FuseOSError(errno.ENOENT)
+        uuid = parts[0]
+        if len(parts) == 1: return "dir", uuid
+
+        entries = users.get(parts[1])
+        if entries is None: raise fuse.FuseOSError(errno.ENOENT)
+        if len(parts) == 2: return "dir", uuid
+
+        is_dir = entries.get(parts[2])
+        if is_dir is None: raise fuse.FuseOSError(errno.ENOENT)
+        if len(parts) == 3: return ("dir" if is_dir else "file"), uuid
+        if len(parts) == 4 and is_dir and parts[3] == README_NAME: return "readme", uuid
+        raise fuse.FuseOSError(errno.ENOENT)
+
+    def _content(self, kind, uuid):
+        if kind == "readme": return f"Drive {uuid} missing.".encode()
+        return f"File unavailable. Connect drive {uuid}.".encode()
+
+    # --- Operations ---
+    def getattr(self, path, fh=None):
+        kind, uuid = self._node(path)
+        if kind == "dir":
+            mode, size, nlink = stat.S_IFDIR | 0o555, 0, 2
+        else:
+            mode, size, nlink = stat.S_IFREG | 0o444, len(self._content(kind, uuid)), 1
+        return dict(st_mode=mode, st_nlink=nlink, st_size=size, st_uid=0, st_gid=0,
+                    st_atime=self.started, st_mtime=self.started, st_ctime=self.started)
+
+    def readdir(self, path, fh):
+        kind, uuid = self._node(path)
+        if kind != "dir": raise fuse.FuseOSError(errno.ENOTDIR)
+        parts = [p for p in path.split("/") if p]
+        drives = self.drives
+
+        if not parts:
+            # Only drives that are actually absent right now
+            mounts = mount_table()
+            names = [u for u in drives if not mounts.is_mounted(ROAMING_ROOT / u)]
+        elif len(parts) == 1:
+            names = list(drives[uuid])
+        elif len(parts) == 2:
+            names = list(drives[uuid][parts[1]])
+        else:
+            names = [README_NAME]
+        return [".", ".."] + names
+
+    def open(self, path, flags):
+        kind, _ = self._node(path)
+        if kind == "dir": raise fuse.FuseOSError(errno.EISDIR)
+        if flags & (os.O_WRONLY | os.O_RDWR): raise fuse.FuseOSError(errno.EROFS)
+        return 0
+
+    def read(self, path, length, offset, fh):
+        kind, uuid = self._node(path)
+        return self._content(kind, uuid)[offset:offset + length]
+
+    def statfs(self, path):
+        return dict(f_bsize=4096, f_frsize=4096, f_blocks=0, f_bfree=0, f_bavail=0, f_namemax=255)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="zenfs missing",
+                                     description="Serve placeholders for absent roaming drives from the Ghost Database")
+    parser.add_argument("mountpoint", nargs="?", default=str(MISSING_ROOT))
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.mountpoint, exist_ok=True)
+    ops = MissingDrivesFS()
+    watch_db(ops, ops.db_root)
+    fuse.FUSE(ops, args.mountpoint, foreground=True, ro=True, allow_other=True, default_permissions=True)
+
+if __name__ == "__main__":
+    main()
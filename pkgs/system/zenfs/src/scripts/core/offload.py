@@ -1,11 +1,14 @@
 # File: src/scripts/core/offload.py
+import os
 import sys
+import heapq
 import shutil
 import psutil
 import json
 import logging
 from pathlib import Path
-from common import ROAMING_ROOT, DB_ROOT, get_system_uuid, run_command
+from common import ROAMING_ROOT, mount_table, load_ignore_list
+from ghost_db import record_entry
 
 logging.basicConfig(level=logging.INFO)
 
@@ -15,33 +18,82 @@ def get_disk_usage_percent(path):
     except:
         return 100.0
 
-def get_candidates(user_home):
+MIN_SIZE = 50 * 1024 * 1024 # Filter small files to avoid thrashing
+MAX_CANDIDATES = 1024
+
+def _walk_large_files(search_root, min_size):
     """
-    Identifies files to offload. 
-    Strategy: Largest files first? Oldest? 
-    For now: Largest files in /home that are NOT symlinks (i.e. real local files).
+    Yields (size, path) for regular local files >= min_size under search_root/<user>.
+    One scandir per directory, sizes from the cached DirEntry.stat; never follows
+    symlinks (links into Roaming/MissingDrives are already offloaded), never crosses
+    into other mounts, and prunes ignored subtrees.
     """
-    candidates = []
-    # Walk real home (resolve /Users symlink if needed, though usually /home is the target)
-    # We assume the script runs as root or has access.
-    # Note: In FUSE mode, /Users is virtual. We must scan the underlying storage (/home).
-    
-    # We need to find where the "Main Drive" storage for users is.
-    # Usually /home.
-    search_root = Path("/home") 
-    
-    for p in search_root.rglob("*"):
-        if p.is_file() and not p.is_symlink():
+    ignore = load_ignore_list()
+    mounts = mount_table()
+    try:
+        users = [e for e in os.scandir(search_root) if e.is_dir(follow_symlinks=False)]
+    except OSError:
+        return
+
+    for user in users:
+        prefix_len = len(user.path) + 1
+        stack = [user.path]
+        while stack:
             try:
-                size = p.stat().st_size
-                # Filter small files to avoid thrashing? > 50MB
-                if size > 50 * 1024 * 1024: 
-                    candidates.append((p, size))
-            except: pass
-    
-    # Sort by size descending
-    candidates.sort(key=lambda x: x[1], reverse=True)
-    return [x[0] for x in candidates]
+                it = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    if entry.is_symlink(): continue
+                    rel = entry.path[prefix_len:]
+                    if ignore.matches(rel, entry.name): continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not mounts.is_mounted(entry.path): stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            size = entry.stat(follow_symlinks=False).st_size
+                            if size >= min_size: yield size, entry.path
+                    except OSError:
+                        pass
+
+def get_candidates(user_home, need_bytes=None, min_size=MIN_SIZE, limit=MAX_CANDIDATES):
+    """
+    Identifies files to offload: the largest real local files under /home.
+
+    Keeps only a bounded min-heap of the `limit` largest files seen so far instead of
+    listing everything. With `need_bytes` (how much has to be freed), the biggest files
+    found so far are handed out as soon as they add up to that amount, so moves start
+    while the scan is still running; the rest follows largest-first once it finishes.
+    Callers can stop iterating at any point, which also stops the scan.
+    """
+    # Note: In FUSE mode, /Users is virtual. We must scan the underlying storage (/home).
+    heap = []
+    held = 0
+    for size, path in _walk_large_files(user_home, min_size):
+        if len(heap) < limit:
+            heapq.heappush(heap, (size, path))
+            held += size
+        elif size > heap[0][0]:
+            held += size - heapq.heappushpop(heap, (size, path))[0]
+        else:
+            continue
+
+        if need_bytes is not None and 0 < need_bytes <= held:
+            # Enough found to reach the target: hand over the biggest, keep scanning after
+            heap.sort(reverse=True)
+            emitted = 0
+            while heap and emitted < need_bytes:
+                size, path = heap.pop(0)
+                emitted += size
+                yield Path(path)
+            heapq.heapify(heap)
+            held -= emitted
+            need_bytes -= emitted
+
+    heap.sort(reverse=True)
+    for _, path in heap:
+        yield Path(path)
 
 def find_target_drive(roaming_root, safe_limit):
     """
@@ -55,8 +107,10 @@ def find_target_drive(roaming_root, safe_limit):
     
     if not roaming_root.exists(): return None
 
+    mounts = mount_table()
     for drive in roaming_root.iterdir():
-        if not drive.is_dir(): continue
+        # Detached drives leave an empty directory on the root fs behind: never offload there
+        if not drive.is_dir() or not mounts.is_mounted(drive): continue
         
         usage = get_disk_usage_percent(drive)
         uuid = drive.name
@@ -101,20 +155,8 @@ def move_to_drive(file_path, drive_uuid):
         logging.info(f"Offloading {file_path.name} to {drive_uuid}...")
         shutil.copy2(file_path, target_file)
         
-        # 3. Update DBs
-        # Drive DB
-        drive_db = target_root / "System/ZenFS/Database" / rel_path
-        if target_file.is_dir():
-            drive_db.mkdir(parents=True, exist_ok=True)
-            (drive_db / ".zenfs-folder").write_text(drive_uuid)
-        else:
-            drive_db.parent.mkdir(parents=True, exist_ok=True)
-            drive_db.write_text(drive_uuid)
-            
-        # System DB (Mirror)
-        sys_db = DB_ROOT / rel_path
-        sys_db.parent.mkdir(parents=True, exist_ok=True)
-        sys_db.write_text(drive_uuid)
+        # 3. Update DBs (Drive DB + System DB mirror)
+        record_entry(str(rel_path), drive_uuid, target_file.is_dir())
         
         # 4. Delete Local
         file_path.unlink()
@@ -141,7 +183,12 @@ def main(config_str):
 
     logging.warning(f"Main Drive usage {current_usage}% > {threshold}%. Starting offload...")
     
-    candidates = get_candidates(Path("/home"))
+    try:
+        usage = psutil.disk_usage("/home")
+        need_bytes = max(0, usage.used - int(usage.total * threshold / 100))
+    except Exception:
+        need_bytes = None
+    candidates = get_candidates(Path("/home"), need_bytes)
     
     for file_path in candidates:
         # Re-check usage after every move? (Expensive but safe)
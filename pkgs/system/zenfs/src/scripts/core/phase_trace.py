@@ -0,0 +1,113 @@
+# File: src/scripts/core/phase_trace.py
+import os
+import json
+import time
+import argparse
+from contextlib import contextmanager
+from common import ZENFS_ROOT
+
+TRACE_FILE = ZENFS_ROOT / "trace.jsonl"
+TRACE_MAX = 8 * 1024 * 1024 # Rotated to trace.jsonl.1 beyond this
+
+def boot_id():
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f: return f.read().strip()
+    except OSError:
+        return "unknown"
+
+class Tracer:
+    """
+    Phase timer for one operation on one device:
+
+        span = Tracer("attach", "sdb1")
+        with span("mount"): ...
+
+    Each finished phase is appended to TRACE_FILE as one JSON line (a single O_APPEND
+    write, so concurrent attaches don't interleave). `total()` covers the whole operation.
+    """
+    _boot = None
+
+    def __init__(self, op, device):
+        self.op = op
+        self.device = device
+        if Tracer._boot is None: Tracer._boot = boot_id()
+
+    @contextmanager
+    def __call__(self, phase):
+        start = time.time()
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self._write({"boot": Tracer._boot, "op": self.op, "device": self.device, "phase": phase,
+                         "start": round(start, 3), "ms": round((time.perf_counter() - t0) * 1000, 2), "ok": ok})
+
+    def total(self):
+        return self("total")
+
+    def _write(self, record):
+        try:
+            if TRACE_FILE.exists() and TRACE_FILE.stat().st_size > TRACE_MAX:
+                os.replace(TRACE_FILE, str(TRACE_FILE) + ".1")
+            fd = os.open(TRACE_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try: os.write(fd, (json.dumps(record) + "\n").encode())
+            finally: os.close(fd)
+        except OSError:
+            pass # Tracing must never break an attach
+
+# --- Summary ---
+def load_records():
+    records = []
+    for path in (str(TRACE_FILE) + ".1", str(TRACE_FILE)):
+        try:
+            with open(path) as f:
+                for line in f:
+                    try: records.append(json.loads(line))
+                    except ValueError: continue # Torn write from a crash
+        except OSError:
+            continue
+    return records
+
+def summarize(records, boots=5, top=10):
+    # Boots in the order they first appear (the log is append-only)
+    order = list(dict.fromkeys(r.get("boot") for r in records))[-boots:]
+    wanted = set(order)
+    records = [r for r in records if r.get("boot") in wanted]
+
+    devices = sorted((r for r in records if r["phase"] == "total"), key=lambda r: -r["ms"])[:top]
+    phases = {}
+    for r in records:
+        if r["phase"] == "total": continue
+        entry = phases.setdefault((r["op"], r["phase"]), [0, 0.0, 0.0, 0])
+        entry[0] += 1
+        entry[1] += r["ms"]
+        entry[2] = max(entry[2], r["ms"])
+        entry[3] += not r.get("ok", True)
+    return order, devices, phases
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="zenfs trace", description="Slowest devices and phases of attach/mint/detach")
+    parser.add_argument("--boots", type=int, default=5, help="How many recent boots to include")
+    parser.add_argument("--top", type=int, default=10, help="Rows per table")
+    args = parser.parse_args(argv)
+
+    order, devices, phases = summarize(load_records(), args.boots, args.top)
+    if not order:
+        print(f"No trace data in {TRACE_FILE}.")
+        return
+
+    print(f"Last {len(order)} boot(s), current: {boot_id()}\n")
+    print("Slowest operations:")
+    for r in devices:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(r["start"]))
+        print(f"  {r['ms']:10.1f} ms  {r['op']:<7} {r['device']:<18} {when}  boot {r['boot'][:8]}")
+
+    print("\nPhases by total time:")
+    print(f"  {'op':<7} {'phase':<16} {'count':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9} {'failed':>6}")
+    for (op, phase), (count, total, worst, failed) in sorted(phases.items(), key=lambda p: -p[1][1])[:args.top]:
+        print(f"  {op:<7} {phase:<16} {count:>6} {total:>10.1f} {total / count:>9.1f} {worst:>9.1f} {failed:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# File: src/scripts/core/read_cache.py
+import os
+import queue
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+from common import ROAMING_ROOT, READ_CACHE_ROOT
+
+# A file is only copied once it has been opened this many times (keeps one-off reads out)
+ADMIT_AFTER = 2
+RECENT_SIZE = 4096
+QUEUE_SIZE = 64
+
+class RoamingReadCache:
+    """
+    Whole-file copies of hot roaming files on the local disk.
+
+    Layout: <root>/<UUID>/<sha1 of path inside drive>. Each copy carries the source's
+    size and mtime (via utime), so validating an entry is one stat on each side and
+    the LRU can be rebuilt from disk after a restart without extra metadata.
+    """
+    def __init__(self, budget, root=READ_CACHE_ROOT, max_file=None):
+        self.root = str(root)
+        self.budget = budget
+        self.max_file = max_file or budget // 4
+        self.entries = OrderedDict() # cache_path -> size
+        self.used = 0
+        self.recent = OrderedDict() # real_path -> open count (admission)
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.queue = queue.Queue(QUEUE_SIZE)
+
+        self._load()
+        threading.Thread(target=self._copier, daemon=True).start()
+
+    def _load(self):
+        os.makedirs(self.root, exist_ok=True)
+        found = []
+        for uuid in os.listdir(self.root):
+            drive_dir = os.path.join(self.root, uuid)
+            if not os.path.isdir(drive_dir): continue
+            for name in os.listdir(drive_dir):
+                path = os.path.join(drive_dir, name)
+                if name.endswith(".part"):
+                    os.unlink(path) # Interrupted copy
+                    continue
+                st = os.stat(path)
+                found.append((st.st_ctime, path, st.st_size))
+        for _, path, size in sorted(found):
+            self.entries[path] = size
+            self.used += size
+        self._evict()
+
+    def _key(self, real_path):
+        """Maps a roaming real path to its cache file, or None for non-roaming paths."""
+        roaming_prefix = str(ROAMING_ROOT) + "/"
+        if not real_path.startswith(roaming_prefix): return None
+        uuid, _, rel = real_path[len(roaming_prefix):].partition("/")
+        digest = hashlib.sha1(rel.encode("utf-8", "surrogateescape")).hexdigest()
+        return os.path.join(self.root, uuid, digest)
+
+    # --- Lookup ---
+    def lookup(self, real_path):
+        """Returns a valid local copy of `real_path`, queueing a copy if it's getting hot."""
+        cache_path = self._key(real_path)
+        if not cache_path: return None
+
+        try:
+            src = os.stat(real_path)
+        except OSError:
+            return None
+
+        with self.lock:
+            cached = cache_path in self.entries
+        if cached:
+            try:
+                st = os.stat(cache_path)
+                if st.st_size == src.st_size and st.st_mtime_ns == src.st_mtime_ns:
+                    with self.lock:
+                        if cache_path in self.entries: self.entries.move_to_end(cache_path)
+                    return cache_path
+            except OSError:
+                pass
+            self._discard(cache_path) # Source changed since we copied it
+
+        if src.st_size <= self.max_file and self._admit(real_path):
+            self._enqueue(real_path, cache_path)
+        return None
+
+    def _admit(self, real_path):
+        with self.lock:
+            count = self.recent.pop(real_path, 0) + 1
+            if count >= ADMIT_AFTER: return True
+            self.recent[real_path] = count
+            if len(self.recent) > RECENT_SIZE:
+                self.recent.popitem(last=False)
+            return False
+
+    def _enqueue(self, real_path, cache_path):
+        with self.lock:
+            if cache_path in self.pending: return
+            self.pending.add(cache_path)
+        try:
+            self.queue.put_nowait((real_path, cache_path))
+        except queue.Full:
+            with self.lock: self.pending.discard(cache_path)
+
+    # --- Population ---
+    def _copier(self):
+        # Single background copier: at most one extra stream competes with foreground reads
+        while True:
+            real_path, cache_path = self.queue.get()
+            try:
+                self._copy(real_path, cache_path)
+            except OSError as e:
+                print(f"Read cache: failed to copy {real_path}: {e}")
+            finally:
+                with self.lock: self.pending.discard(cache_path)
+
+    def _copy(self, real_path, cache_path):
+        before = os.stat(real_path)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = cache_path + ".part"
+        try:
+            shutil.copyfile(real_path, tmp_path)
+            after = os.stat(real_path)
+            if (after.st_size, after.st_mtime_ns) != (before.st_size, before.st_mtime_ns):
+                return # Modified mid-copy; try again on a later open
+            os.utime(tmp_path, ns=(after.st_atime_ns, after.st_mtime_ns))
+            os.rename(tmp_path, cache_path)
+        finally:
+            if os.path.exists(tmp_path): os.unlink(tmp_path)
+
+        with self.lock:
+            self.used -= self.entries.pop(cache_path, 0)
+            self.entries[cache_path] = after.st_size
+            self.used += after.st_size
+        self._evict()
+
+    # --- Eviction ---
+    def _evict(self):
+        victims = []
+        with self.lock:
+            while self.used > self.budget and self.entries:
+                path, size = self.entries.popitem(last=False)
+                self.used -= size
+                victims.append(path)
+        for path in victims:
+            try: os.unlink(path)
+            except OSError: pass
+
+    def _discard(self, cache_path):
+        with self.lock:
+            self.used -= self.entries.pop(cache_path, 0)
+        try: os.unlink(cache_path)
+        except OSError: pass
+
+    def invalidate(self, real_path):
+        """Drops the copy of a file that is being opened for writing."""
+        cache_path = self._key(real_path)
+        if cache_path: self._discard(cache_path)
+
+    def drop_drives(self, mounted):
+        """Removes cached data for every drive that isn't in `mounted` (called on detach)."""
+        for uuid in os.listdir(self.root):
+            if uuid in mounted: continue
+            drive_dir = os.path.join(self.root, uuid) + "/"
+            with self.lock:
+                for path in [p for p in self.entries if p.startswith(drive_dir)]:
+                    self.used -= self.entries.pop(path)
+            shutil.rmtree(drive_dir, ignore_errors=True)
@@ -0,0 +1,154 @@
+# File: src/scripts/core/readahead.py
+import os
+import time
+import threading
+from contextlib import nullcontext
+
+READAHEAD_MIN = 256 * 1024
+READAHEAD_MAX = 4 * 1024 * 1024
+SEQUENTIAL_AFTER = 2 # Consecutive in-order reads before we start prefetching
+REPORT_AFTER = 64 * 1024 * 1024 # Only log throughput for sizeable transfers
+
+class ReadAhead:
+    """
+    Sequential-access detector and prefetcher for one file handle.
+
+    Once reads arrive in order, the next window is fetched asynchronously into a spare
+    buffer while the current one is served; the window doubles up to `max_window`.
+    Two buffers are allocated once and swapped, so streaming a large file doesn't churn
+    memory. Any out-of-order read drops back to plain pread.
+    """
+    def __init__(self, fh, executor, gate=None, max_window=READAHEAD_MAX):
+        self.fh = fh
+        self.executor = executor
+        self.gate = gate if gate is not None else nullcontext()
+        self.max_window = max_window
+        self.lock = threading.Lock()
+
+        self.next_offset = None
+        self.streak = 0
+        self.window = min(READAHEAD_MIN, max_window)
+
+        self.buffers = None # [current, spare], allocated on first sequential run
+        self.current = memoryview(b"")
+        self.current_offset = 0
+        self.current_eof = False # The fill that produced `current` came back short
+        self.future = None
+        self.future_offset = 0
+        self.future_size = 0
+
+        # Throughput accounting (served to FUSE vs. time spent reading the drive)
+        self.served = 0
+        self.first_read = None
+        self.last_read = None
+        self.backing_bytes = 0
+        self.backing_time = 0.0
+
+    # --- Backing Reads ---
+    def _fill(self, index, offset, size):
+        buf = memoryview(self.buffers[index])[:size]
+        start = time.perf_counter()
+        with self.gate:
+            n = os.preadv(self.fh, [buf], offset)
+        self.backing_time += time.perf_counter() - start
+        self.backing_bytes += n
+        return buf[:n]
+
+    def _pread(self, length, offset):
+        start = time.perf_counter()
+        with self.gate:
+            data = os.pread(self.fh, length, offset)
+        self.backing_time += time.perf_counter() - start
+        self.backing_bytes += len(data)
+        return data
+
+    def _prefetch(self):
+        if self.current_eof: return
+        self.window = min(self.window * 2, self.max_window)
+        self.future_offset = self.current_offset + len(self.current)
+        self.future_size = self.window
+        self.future = self.executor.submit(self._fill, 1, self.future_offset, self.window)
+
+    def _buffered(self, length, offset):
+        start = offset - self.current_offset
+        if 0 <= start and start + length <= len(self.current):
+            return bytes(self.current[start:start + length])
+        # Tail of the current window: only a complete answer at EOF
+        if 0 <= start < len(self.current) and self.current_eof:
+            return bytes(self.current[start:])
+        return None
+
+    # --- Reads ---
+    def read(self, length, offset):
+        with self.lock:
+            now = time.perf_counter()
+            if self.first_read is None: self.first_read = now
+            self.last_read = now
+
+            sequential = offset == self.next_offset
+            self.next_offset = offset + length
+            if not sequential:
+                self.streak = 0
+                self.window = min(READAHEAD_MIN, self.max_window)
+                data = self._pread(length, offset)
+            else:
+                self.streak += 1
+                data = self._read_sequential(length, offset)
+            self.served += len(data)
+            return data
+
+    def _read_sequential(self, length, offset):
+        data = self._buffered(length, offset)
+        if data is not None: return data
+
+        # A read straddling the window end keeps the buffered head; the rest comes after it
+        head = b""
+        start = offset - self.current_offset
+        if 0 <= start < len(self.current):
+            head = bytes(self.current[start:])
+            offset, length = offset + len(head), length - len(head)
+
+        if self.future is not None:
+            # Swap in the prefetched window if it covers this read
+            filled = self.future.result()
+            self.future = None
+            if self.future_offset == offset and len(filled) > 0:
+                self.buffers.reverse()
+                self.current, self.current_offset = filled, offset
+                self.current_eof = len(filled) < self.future_size
+                self._prefetch()
+                data = self._buffered(length, offset)
+                if data is not None: return head + data
+
+        if self.streak < SEQUENTIAL_AFTER or length > self.max_window:
+            return head + self._pread(length, offset)
+
+        # Sequential run confirmed: read a whole window and start prefetching the next
+        if self.buffers is None:
+            self.buffers = [bytearray(self.max_window), bytearray(self.max_window)]
+        size = max(self.window, length)
+        self.current, self.current_offset = self._fill(0, offset, size), offset
+        self.current_eof = len(self.current) < size
+        self._prefetch()
+        return head + bytes(self.current[:length])
+
+    def invalidate(self):
+        """Forget buffered data (the handle was written to)."""
+        with self.lock:
+            if self.future is not None:
+                self.future.result()
+                self.future = None
+            self.current = memoryview(b"")
+            self.current_eof = False
+            self.next_offset = None
+
+    def close(self):
+        self.invalidate()
+
+    def report(self):
+        """Returns a throughput summary line for large transfers, or None."""
+        if self.served < REPORT_AFTER or not self.first_read: return None
+        elapsed = max(self.last_read - self.first_read, 1e-6)
+        served_rate = self.served / elapsed / 1e6
+        direct_rate = self.backing_bytes / max(self.backing_time, 1e-6) / 1e6
+        return f"{self.served / 1e6:.0f} MB at {served_rate:.1f} MB/s through ZenFS, drive delivered {direct_rate:.1f} MB/s"
@@ -1,8 +1,13 @@
 # File: src/scripts/core/roaming_service.py
-import shutil
 import os
+import json
+import time
+import socket
+import threading
+import sqlite3
 from pathlib import Path
-from common import DB_ROOT, ROAMING_ROOT, MISSING_ROOT, ZENFS_ROOT, notify
+from common import DB_ROOT, ROAMING_ROOT, MISSING_ROOT, ZENFS_ROOT, ROAMING_SOCKET, notify, mount_table
+from ghost_db import open_db, db_exists, drive_db_root, Journal
 
 def ensure_missing_placeholder(uuid, relative_path):
     target_dir = MISSING_ROOT / uuid / relative_path.parent
@@ -17,87 +22,340 @@ def ensure_missing_placeholder(uuid, relative_path):
              placeholder.write_text(f"File unavailable. Connect drive {uuid}.")
     return placeholder
 
-def sync_symlinks():
-    # SKIPS if /Users is not a symlink (i.e. we are in FUSE mode).
+# --- Symlink Reconciler ---
+HOME_ROOT = Path("/home")
+
+def _desired_links(db):
+    """
+    {user: {name: link source or None}} from one pass over the system DB's top-level
+    entries. None means 'owned by this machine': any symlink there should go.
+    """
+    desired = {}
+    mounted = {}
+    for user_name, ghost_name, uuid, _ in db.top_level():
+        links = desired.setdefault(user_name, {})
+        if uuid == "." or uuid == "system":
+            links[ghost_name] = None
+            continue
+        if uuid not in mounted:
+            # Detach leaves the empty mountpoint behind, so ask the mount table
+            mounted[uuid] = mount_table().is_mounted(ROAMING_ROOT / uuid)
+        if mounted[uuid]:
+            links[ghost_name] = ROAMING_ROOT / uuid / "Users" / user_name / ghost_name
+        else:
+            links[ghost_name] = MISSING_ROOT / uuid / user_name / ghost_name
+    return desired
+
+def _actual_links(home):
+    """{name: symlink target or None for real files} from a single scandir of a home directory."""
+    actual = {}
+    with os.scandir(home) as it:
+        for entry in it:
+            if entry.is_symlink():
+                try: actual[entry.name] = Path(os.readlink(entry.path))
+                except OSError: continue
+            else:
+                actual[entry.name] = None
+    return actual
+
+def plan_symlinks(db):
+    """Returns the minimal list of (action, link path, source) turning /home into the DB's view."""
+    plan = []
+    zenfs_prefixes = (str(ROAMING_ROOT) + "/", str(MISSING_ROOT) + "/")
+
+    for user_name, links in _desired_links(db).items():
+        real_home = HOME_ROOT / user_name
+        try: actual = _actual_links(real_home)
+        except OSError: continue # No such user on this machine
+
+        for name, source in links.items():
+            current = actual.get(name, False) # False: nothing there
+            if source is None:
+                if current: plan.append(("unlink", real_home / name, None))
+            elif current is None:
+                continue # A real file wins over the ghost
+            elif current is False:
+                plan.append(("link", real_home / name, source))
+            elif current != source:
+                plan.append(("relink", real_home / name, source))
+
+        # Dead ZenFS links: pointing into Roaming/MissingDrives but no longer in the DB
+        for name, target in actual.items():
+            if not target or name in links: continue
+            if str(target).startswith(zenfs_prefixes) and not db.contains(f"{user_name}/{name}"):
+                plan.append(("unlink", real_home / name, target))
+    return plan
+
+def apply_symlinks(plan):
+    # With 'zenfs missing' serving MISSING_ROOT the placeholders are virtual: nothing to write
+    materialise = not os.path.ismount(MISSING_ROOT)
+    for action, link, source in plan:
+        try:
+            if action in ("unlink", "relink"):
+                link.unlink()
+                if action == "unlink": print(f"Removing link: {link}")
+            if action in ("link", "relink"):
+                if materialise and str(source).startswith(str(MISSING_ROOT) + "/"):
+                    uuid = source.relative_to(MISSING_ROOT).parts[0]
+                    ensure_missing_placeholder(uuid, source.relative_to(MISSING_ROOT / uuid))
+                link.symlink_to(source)
+        except Exception as e: print(f"Failed to {action} {link}: {e}")
+
+def symlink_mode():
+    # False if /Users is not a symlink (i.e. we are in FUSE mode).
     users_mount = Path("/Users")
-    if not users_mount.is_symlink() and users_mount.is_dir():
+    return users_mount.is_symlink() or not users_mount.is_dir()
+
+def sync_symlinks(dry_run=False):
+    if not symlink_mode():
         print("FUSE Mode detected (or /Users is a real dir). Skipping Symlink generation.")
         return
 
     print("Syncing Symlinks in /Users...")
-    if not DB_ROOT.exists(): return
-
-    # --- Phase 1: Create/Update Links ---
-    for user_path in DB_ROOT.iterdir():
-        if not user_path.is_dir(): continue
-        
-        user_name = user_path.name
-        real_home = Path(f"/home/{user_name}") 
-        if not real_home.exists(): continue
-        
-        for ghost_item in user_path.iterdir():
-            ghost_name = ghost_item.name
-            target_link = real_home / ghost_name
-            
-            uuid = None
-            is_dir = ghost_item.is_dir()
-            try:
-                if is_dir: uuid = (ghost_item / ".zenfs-folder").read_text().strip()
-                else: uuid = ghost_item.read_text().strip()
-            except: continue
-
-            link_source = None
-            if uuid == "." or uuid == "system":
-                if target_link.is_symlink(): target_link.unlink()
-                continue
-            else:
-                roaming_mount = ROAMING_ROOT / uuid
-                if roaming_mount.exists():
-                    link_source = roaming_mount / "Users" / user_name / ghost_name
-                else:
-                    rel_path = Path(user_name) / ghost_name
-                    link_source = ensure_missing_placeholder(uuid, rel_path)
-
-            if target_link.exists():
-                if not target_link.is_symlink(): continue
-                if target_link.readlink() == link_source: continue
-                target_link.unlink()
-            
-            try: target_link.symlink_to(link_source)
-            except Exception as e: print(f"Failed to link {ghost_name}: {e}")
-
-    # --- Phase 2: Cleanup Dead Links ---
-    for user_path in DB_ROOT.iterdir():
-        if not user_path.is_dir(): continue
-        user_name = user_path.name
-        real_home = Path(f"/home/{user_name}")
-        if not real_home.exists(): continue
-
-        for item in real_home.iterdir():
-            if item.is_symlink():
-                try:
-                    target = item.readlink()
-                    is_zenfs_link = str(target).startswith(str(ROAMING_ROOT)) or \
-                                    str(target).startswith(str(MISSING_ROOT))
-                    
-                    if is_zenfs_link:
-                        db_entry = DB_ROOT / user_name / item.name
-                        if not db_entry.exists():
-                            print(f"Removing dead ZenFS link: {item.name}")
-                            item.unlink()
-                except OSError: pass
-
-def main():
+    if not db_exists(DB_ROOT): return
+
+    start = time.perf_counter()
+    with open_db(DB_ROOT) as db:
+        plan = plan_symlinks(db)
+    planned = time.perf_counter()
+
+    if dry_run:
+        for action, link, source in plan:
+            print(f"  {action:<6} {link}" + (f" -> {source}" if source else ""))
+    else:
+        apply_symlinks(plan)
+    done = time.perf_counter()
+
+    counts = {a: sum(1 for p in plan if p[0] == a) for a in ("link", "relink", "unlink")}
+    print(f"Symlinks: {counts['link']} new, {counts['relink']} retargeted, {counts['unlink']} removed "
+          f"(plan {1000 * (planned - start):.1f} ms, apply {1000 * (done - planned):.1f} ms"
+          f"{', dry run' if dry_run else ''}).")
+
+# --- Drive Departure ---
+def departing_entries(uuid, drive_root):
+    """
+    Top-level entries owned by a drive that is about to go away, read from its own
+    database while it's still mounted. Falls back to the system DB (e.g. the device
+    already vanished) at the cost of a scan.
+    """
+    try:
+        if db_exists(drive_db_root(drive_root)):
+            with open_db(drive_db_root(drive_root)) as db:
+                return [(user, name) for user, name, owner, _ in db.top_level() if owner == uuid]
+    except (OSError, sqlite3.Error) as e:
+        print(f"Drive DB of {uuid} unreadable ({e}), using the system DB.")
+    if not db_exists(DB_ROOT): return []
+    with open_db(DB_ROOT) as db:
+        return [(user, name) for user, name, owner, _ in db.top_level() if owner == uuid]
+
+def retarget_departed(uuid, entries):
+    """Points the links of a detached drive at its placeholders; touches nothing else."""
+    if not symlink_mode() or not db_exists(DB_ROOT): return
+    start = time.perf_counter()
+    roaming_prefix = str(ROAMING_ROOT / uuid) + "/"
+    plan = []
+    with open_db(DB_ROOT) as db:
+        for user_name, ghost_name in entries:
+            current = db.get(f"{user_name}/{ghost_name}")
+            if not current or current[0] != uuid: continue # Another drive (or local) owns it now
+            link = HOME_ROOT / user_name / ghost_name
+            try: target = os.readlink(link)
+            except OSError: continue # Not a link (a real file wins) or no such user
+            if target.startswith(roaming_prefix):
+                plan.append(("relink", link, MISSING_ROOT / uuid / user_name / ghost_name))
+    apply_symlinks(plan)
+    print(f"Retargeted {len(plan)} of {len(entries)} links owned by {uuid} "
+          f"in {1000 * (time.perf_counter() - start):.1f} ms.")
+
+# --- Database Merge ---
+# (epoch, generation) of each drive's journal as of our last merge, next to the system DB
+MERGED_FILE = Path(str(DB_ROOT) + ".merged.json")
+
+def load_merged():
+    try:
+        with open(MERGED_FILE) as f: return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_merged(merged):
+    tmp = MERGED_FILE.with_suffix(".tmp")
+    with open(tmp, "w") as f: json.dump(merged, f)
+    os.replace(tmp, MERGED_FILE)
+
+def merge_drive_db(drive_dir, merged):
+    """
+    Brings the system DB up to date with one drive's Ghost Database. Applies just the
+    journal entries since the last merge when possible, else merges the whole database
+    (dropping system entries this drive no longer has). Returns what it did.
+    """
+    uuid = drive_dir.name
+    db_root = drive_db_root(drive_dir)
+    if not db_exists(db_root): return "no database"
+
+    journal = Journal(db_root)
+    head = journal.head()
+    if head is None:
+        # Database predates journals: start one so the next sync can skip or go incremental
+        try: journal.reset()
+        except OSError: pass
+        head = journal.head()
+    last = merged.get(uuid)
+    if head and last and tuple(last) == head: return "unchanged"
+
+    delta = journal.since(*last) if head and last else None
+    with open_db(DB_ROOT) as system_db, system_db.batch():
+        if delta is not None:
+            changes, head = delta
+            for op, rel, owner, is_dir in changes:
+                if op == "put":
+                    system_db.put(rel, owner, is_dir)
+                # Only drop what this drive owns: the same name may now live on another drive
+                elif (system_db.get(rel) or (None,))[0] == uuid:
+                    system_db.delete(rel)
+            result = f"{len(changes)} changes"
+        else:
+            with open_db(db_root) as roaming_db:
+                entries = list(roaming_db.entries())
+            present = {rel for rel, _, _ in entries}
+            stale = [rel for rel, owner, _ in system_db.entries() if owner == uuid and rel not in present]
+            for rel in stale: system_db.delete(rel)
+            system_db.put_many(entries)
+            result = f"full merge ({len(entries)} entries, {len(stale)} stale)"
+
+    if head: merged[uuid] = list(head)
+    return result
+
+def sync():
     print("ZenFS Roaming: Syncing Databases...")
     
-    # 1. Merge Roaming Databases into System DB
+    # 1. Merge Roaming Databases into System DB (only what changed since the last sync)
+    merged = load_merged()
     for drive_dir in ROAMING_ROOT.iterdir():
         if drive_dir.is_dir():
-            roaming_db = drive_dir / "System/ZenFS/Database"
-            if roaming_db.exists():
-                try: shutil.copytree(roaming_db, DB_ROOT, dirs_exist_ok=True)
-                except: pass
+            try: print(f"  {drive_dir.name}: {merge_drive_db(drive_dir, merged)}")
+            except Exception as e: print(f"  {drive_dir.name}: merge failed: {e}")
+    try: save_merged(merged)
+    except OSError as e: print(f"Failed to record merge state: {e}")
     
     # 2. Build the Union View (Symlink Mode Only)
     sync_symlinks()
-    notify("ZenFS", "Filesystem Sync Complete")
\ No newline at end of file
+
+# --- Resident Service ---
+# attach/detach send one JSON line ({"event", "uuid", "wait"}) over ROAMING_SOCKET.
+# Requests arriving within DEBOUNCE of each other share one sync (MAX_DELAY caps the wait).
+DEBOUNCE = 1.0
+MAX_DELAY = 5.0
+WAIT_TIMEOUT = 300
+
+class SyncCoalescer:
+    def __init__(self, debounce=DEBOUNCE, max_delay=MAX_DELAY):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.cond = threading.Condition()
+        self.requested = 0 # Generation of the newest request
+        self.completed = 0 # Newest generation covered by a finished sync
+        self.first_at = None
+        self.last_at = None
+        self.events = []
+        self.immediate = False
+
+    def request(self, event, immediate=False):
+        """Queues a sync and returns the generation to wait for. `immediate` skips the quiet period."""
+        with self.cond:
+            now = time.monotonic()
+            self.requested += 1
+            self.immediate = self.immediate or immediate
+            if self.first_at is None: self.first_at = now
+            self.last_at = now
+            self.events.append(event)
+            self.cond.notify_all()
+            return self.requested
+
+    def wait(self, generation, timeout=WAIT_TIMEOUT):
+        with self.cond:
+            return self.cond.wait_for(lambda: self.completed >= generation, timeout)
+
+    def _next_burst(self):
+        with self.cond:
+            self.cond.wait_for(lambda: self.requested > self.completed)
+            # Quiet period: keep collecting until no request for `debounce` (or `max_delay` overall)
+            while True:
+                now = time.monotonic()
+                deadline = min(self.last_at + self.debounce, self.first_at + self.max_delay)
+                if now >= deadline or self.immediate: break
+                self.cond.wait(deadline - now)
+            generation, events = self.requested, self.events
+            self.events, self.first_at, self.immediate = [], None, False
+            return generation, events
+
+    def run(self, fn):
+        while True:
+            generation, events = self._next_burst()
+            start = time.perf_counter()
+            try: fn()
+            except Exception as e: print(f"Roaming sync failed: {e}")
+            print(f"Synced {len(events)} requests ({', '.join(events)}) in {time.perf_counter() - start:.2f}s.")
+            with self.cond:
+                self.completed = generation
+                self.cond.notify_all()
+
+def _handle(conn, coalescer):
+    with conn:
+        try:
+            request = json.loads(conn.makefile().readline() or "{}")
+            event = f"{request.get('event', 'sync')} {request.get('uuid') or ''}".strip()
+            generation = coalescer.request(event, bool(request.get("immediate")))
+            done = coalescer.wait(generation) if request.get("wait") else None
+            conn.sendall((json.dumps({"queued": True, "done": done}) + "\n").encode())
+        except (OSError, ValueError) as e:
+            print(f"Bad roaming request: {e}")
+
+def serve(socket_path=ROAMING_SOCKET):
+    coalescer = SyncCoalescer()
+
+    def sync_burst():
+        sync()
+        notify("ZenFS", "Filesystem Sync Complete")
+
+    threading.Thread(target=coalescer.run, args=(sync_burst,), daemon=True).start()
+    coalescer.request("startup") # Catch up on anything attached while we were down
+
+    socket_path = Path(socket_path)
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    try: socket_path.unlink()
+    except FileNotFoundError: pass
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(socket_path))
+    os.chmod(socket_path, 0o600)
+    server.listen(16)
+    print(f"ZenFS Roaming: listening on {socket_path}")
+    while True:
+        conn, _ = server.accept()
+        threading.Thread(target=_handle, args=(conn, coalescer), daemon=True).start()
+
+def request_sync(event="sync", uuid=None, wait=False, immediate=False):
+    """
+    Asks the resident roaming service for a sync. Falls back to running one in-process
+    when the service isn't up (early boot, service disabled). `immediate` is for callers
+    that already coalesced their own burst (hotplug).
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(WAIT_TIMEOUT if wait else 5)
+            conn.connect(str(ROAMING_SOCKET))
+            conn.sendall((json.dumps({"event": event, "uuid": uuid, "wait": wait, "immediate": immediate}) + "\n").encode())
+            reply = json.loads(conn.makefile().readline() or "{}")
+            if reply.get("queued"): return
+    except (OSError, ValueError) as e:
+        print(f"Roaming service unavailable ({e}), syncing directly.")
+    main()
+
+def main(dry_run=False):
+    if dry_run:
+        # Show what the union view would change, without touching the DB or /home
+        sync_symlinks(dry_run=True)
+        return
+
+    sync()
+    notify("ZenFS", "Filesystem Sync Complete")
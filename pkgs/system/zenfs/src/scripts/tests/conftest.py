@@ -0,0 +1,6 @@
+# File: src/scripts/tests/conftest.py
+import sys
+from pathlib import Path
+
+# The core scripts import each other as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "core"))
@@ -0,0 +1,86 @@
+# File: src/scripts/tests/test_ignore.py
+import random
+import fnmatch
+from pathlib import Path
+import pytest
+from common import IgnoreMatcher, is_ignored
+
+ROOT = Path("/Users/alice")
+
+def reference_is_ignored(path_obj, relative_root, ignore_list):
+    """The original per-rule loop IgnoreMatcher has to agree with."""
+    try:
+        rel_str = str(path_obj.relative_to(relative_root))
+        name = path_obj.name
+        for rule in ignore_list:
+            clean_rule = rule[1:] if rule.startswith("*") else rule
+            if "/" in clean_rule:
+                if rel_str.startswith(clean_rule): return True
+            else:
+                if rule == name or fnmatch.fnmatch(name, rule): return True
+    except:
+        pass
+    return False
+
+PATHS = [
+    ".config", ".cache/x", "node_modules", "a.tmp", "Downloads", "Downloads/Temp",
+    "Downloads/Temp/file", "Downloads/Tempest", "x/Downloads/Temp", "[a]", "a", "b",
+    "*", "ab", "a*b", "Temp", "Temp2", "deep/a.tmp", "[", "a/b/c", "[!x]y", "a[b]", "xy", "ay",
+]
+
+CORPUS = [
+    # '*' is stripped for path rules only
+    ["*Downloads/Temp"],
+    ["*/Downloads/Temp"],
+    ["*.tmp"],
+    ["*Temp"],
+    # Matching stops at the first non-string rule
+    [".config", 5, "*.tmp"],
+    [None, ".config"],
+    ["*.tmp", {"x": 1}, "Downloads/Temp"],
+    # Unclosed '['
+    ["["],
+    ["[ab"],
+    ["a[", "Downloads/["],
+    # Bracket rules also match their own literal name
+    ["[a]"],
+    ["[!x]y", "a[b]"],
+    # Empty rules
+    [""],
+    ["", ".config"],
+    [],
+    # A bare '*'
+    ["*"],
+    ["*", "Downloads/Temp"],
+    # Everyday lists
+    [".config", "node_modules", "*.tmp", "Downloads/Temp"],
+    ["[ab]*", "?", "Temp*", "[!a]", ".*", "**/x"],
+]
+
+def check(rules, rel):
+    path = ROOT / rel
+    expected = reference_is_ignored(path, ROOT, rules)
+    assert is_ignored(path, ROOT, IgnoreMatcher(rules)) == expected, (rules, rel)
+    assert is_ignored(path, ROOT, rules) == expected, (rules, rel)
+
+@pytest.mark.parametrize("rules", CORPUS, ids=repr)
+def test_corpus_matches_reference(rules):
+    for rel in PATHS:
+        check(rules, rel)
+    # Outside the root nothing is ignored
+    assert not is_ignored(Path("/elsewhere/.config"), ROOT, IgnoreMatcher(rules))
+
+def test_randomised_rules_match_reference():
+    rng = random.Random(16)
+    alphabet = "ab.*?[]/!-x"
+    pool = [rule for rules in CORPUS for rule in rules]
+
+    def word(n):
+        return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, n)))
+
+    for _ in range(2000):
+        rules = rng.sample(pool, rng.randint(0, 4)) + [word(4) for _ in range(rng.randint(0, 2))]
+        for _ in range(5):
+            parts = [(rng.choice(PATHS) if rng.random() < 0.5 else word(5)).replace("/", "_") or "q"
+                     for _ in range(rng.randint(1, 3))]
+            check(rules, "/".join(parts))
@@ -0,0 +1,56 @@
+# File: src/scripts/tests/test_readahead.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from readahead import ReadAhead
+
+FILE_SIZE = 8 * 1024 * 1024 + 12345 # Doesn't end on a window boundary either
+
+@pytest.fixture(scope="module")
+def payload(tmp_path_factory):
+    data = os.urandom(FILE_SIZE)
+    path = tmp_path_factory.mktemp("readahead") / "data.bin"
+    path.write_bytes(data)
+    return path, data
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        yield pool
+
+def stream(reader, chunk):
+    """Reads like FUSE does: sequential requests until a short (EOF) answer."""
+    out = []
+    offset = 0
+    while True:
+        data = reader.read(chunk, offset)
+        out.append(data)
+        offset += len(data)
+        if len(data) < chunk: return b"".join(out), offset
+
+@pytest.mark.parametrize("chunk", [4096, 12 * 1024, 100 * 1024, 128 * 1024, 333333, 1024 * 1024 + 1])
+def test_unaligned_sequential_reads_are_complete(payload, executor, chunk):
+    path, data = payload
+    fh = os.open(path, os.O_RDONLY)
+    try:
+        reader = ReadAhead(fh, executor)
+        got, end = stream(reader, chunk)
+        reader.close()
+    finally:
+        os.close(fh)
+    assert end == FILE_SIZE
+    assert got == data
+
+def test_small_window_and_random_access(payload, executor):
+    path, data = payload
+    fh = os.open(path, os.O_RDONLY)
+    try:
+        reader = ReadAhead(fh, executor, max_window=64 * 1024)
+        got, _ = stream(reader, 50000)
+        assert got == data
+        # Out-of-order reads fall back to pread, then a new run starts
+        assert reader.read(1000, 777) == data[777:1777]
+        assert reader.read(70000, FILE_SIZE - 1000) == data[-1000:]
+        reader.close()
+    finally:
+        os.close(fh)